@@ -1,64 +1,193 @@
 """Anthropic provider implementation."""
 
-import anthropic
 import base64
+import functools
 import time
-from typing import Dict, Any, List
+from typing import TYPE_CHECKING, Dict, Any, List
 from .base import TextProvider, VisionProvider, TextProcessingRequest, TextProcessingResponse
-from .base import VisionProcessingRequest, VisionProcessingResponse
+from .base import VisionProcessingRequest, VisionProcessingResponse, exact_cached, semantic_cached
 import os
-import json
 import asyncio
+import orjson
+
+if TYPE_CHECKING:
+    import anthropic
+
+
+# Input caps: classification only needs the opening of a document, and
+# extraction output is bounded by max_tokens, so larger inputs only add cost.
+CLASSIFY_MAX_CHARS = 2000
+EXTRACT_MAX_CHARS = 50_000
+
+# The static instructions and response schema go in the system prompt, ending
+# in a cache breakpoint, and only the request text in the user message, so
+# every call for a task shares the same prefix. Anthropic only caches prefixes
+# of at least 1024 tokens (2048 on Haiku models); these prompts are shorter, so
+# the breakpoint takes effect only once the instructions grow past that.
+CLASSIFY_SYSTEM = """Analyze the user's text and classify it according to S1000D data module types.
+
+Respond in JSON format:
+{
+    "dm_type": "PROC|DESC|IPD|CIR|SNS|WIR|GEN",
+    "title": "extracted title",
+    "confidence": 0.95,
+    "metadata": {
+        "language": "en-US",
+        "technical_domain": "aviation|electronics|mechanical|general",
+        "complexity": "basic|intermediate|advanced"
+    }
+}"""
+
+EXTRACT_SYSTEM = """Extract structured data from the user's technical text for S1000D data module creation.
+
+Respond in JSON format:
+{
+    "sections": [
+        {
+            "type": "paragraph|list|table|figure",
+            "title": "section title",
+            "content": "extracted content",
+            "level": 1
+        }
+    ],
+    "references": [
+        {
+            "type": "figure|table|dm",
+            "reference": "Figure 1|Table 1|DMC-XXX",
+            "title": "reference title"
+        }
+    ],
+    "warnings": ["safety warning 1", "safety warning 2"],
+    "cautions": ["caution 1", "caution 2"],
+    "notes": ["note 1", "note 2"]
+}"""
+
+STE_SYSTEM = """Rewrite the user's technical text to comply with ASD-STE100 (Simplified Technical English) standards.
+
+STE Requirements:
+- Use only approved words from the STE dictionary
+- Maximum sentence length: 20 words
+- Use active voice
+- Use simple present tense
+- Avoid complex grammatical structures
+- Use clear, unambiguous language
+
+Respond in JSON format:
+{
+    "rewritten_text": "STE compliant text",
+    "ste_score": 0.92,
+    "improvements": ["improvement 1", "improvement 2"],
+    "warnings": ["warning if any"]
+}"""
+
+REVIEW_SYSTEM = (
+    "Review the user's S1000D data module content for grammar, clarity and STE compliance.\n"
+    'Provide JSON as {"issues": ["issue1", "issue2"], "suggested_text": "corrected text"}.'
+)
+
+CAPTION_PROMPT = (
+    "Generate a technical caption for this image suitable for S1000D documentation. "
+    "Focus on technical accuracy and clarity."
+)
+OBJECTS_PROMPT = (
+    "Identify and list all technical objects, components, and parts visible in this image. "
+    "Return as a JSON array of object names."
+)
+HOTSPOTS_PROMPT = (
+    "Identify key areas in this technical image that should have interactive hotspots. "
+    'Return coordinates and descriptions in JSON format: '
+    '[{"x": 100, "y": 150, "width": 50, "height": 30, "description": "component name"}]'
+)
+
+
+def _system(instructions: str) -> List[Dict[str, Any]]:
+    """Build a system prompt with a cache breakpoint after the static instructions."""
+    return [{"type": "text", "text": instructions, "cache_control": {"type": "ephemeral"}}]
+
+
+def _messages(text: str) -> List[Dict[str, Any]]:
+    """Build the user message carrying only the request text."""
+    # The API rejects empty text content.
+    return [{"role": "user", "content": text or "(no text)"}]
+
+
+def _image_content(prompt: str, request: VisionProcessingRequest) -> List[Dict[str, Any]]:
+    """Build message content pairing a static vision prompt with the request image."""
+    return [
+        {"type": "text", "text": prompt},
+        {
+            "type": "image",
+            "source": {"type": "base64", "media_type": "image/jpeg", "data": request.image_base64()},
+        },
+    ]
+
+
+def _json_list(content: str) -> List[Any] | None:
+    """Parse a JSON array from model output, tolerating a markdown code fence."""
+    stripped = content.strip()
+    if stripped.startswith("```"):
+        stripped = stripped.strip("`").removeprefix("json").strip()
+    if not stripped.startswith(("[", "{")):
+        return None
+    try:
+        parsed = orjson.loads(stripped)
+    except orjson.JSONDecodeError:
+        return None
+    return parsed if isinstance(parsed, list) else None
+
+
+@functools.lru_cache(maxsize=1)
+def _get_client() -> "anthropic.AsyncAnthropic":
+    """Return the process-wide client so every provider shares one connection pool."""
+    # Imported on first use so deployments that never select Anthropic skip the SDK.
+    import anthropic
+    import httpx
+
+    return anthropic.AsyncAnthropic(
+        api_key=os.environ.get("ANTHROPIC_API_KEY"),
+        max_retries=2,
+        http_client=anthropic.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100)
+        ),
+    )
+
+
+async def _stream_text(client, **kwargs) -> str:
+    """Stream a message and return the concatenated text once it completes."""
+    chunks: List[str] = []
+    async with client.messages.stream(**kwargs) as stream:
+        async for text in stream.text_stream:
+            chunks.append(text)
+    return "".join(chunks)
 
 
 class AnthropicTextProvider(TextProvider):
     """Anthropic text processing provider."""
     
     def __init__(self, model: str | None = None):
-        self.client = anthropic.AsyncAnthropic(
-            api_key=os.environ.get("ANTHROPIC_API_KEY")
-        )
+        self.client = _get_client()
         self.model = model or os.environ.get("TEXT_MODEL", "claude-3-sonnet-20240229")
     
+    @exact_cached(task="classify")
+    @semantic_cached(task="classify")
     async def classify_document(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Classify document type and extract basic metadata."""
-        start_time = time.time()
-        
-        prompt = f"""
-        Analyze this text and classify it according to S1000D data module types.
-        
-        Text: {request.text[:2000]}...
-        
-        Respond in JSON format:
-        {{
-            "dm_type": "PROC|DESC|IPD|CIR|SNS|WIR|GEN",
-            "title": "extracted title",
-            "confidence": 0.95,
-            "metadata": {{
-                "language": "en-US",
-                "technical_domain": "aviation|electronics|mechanical|general",
-                "complexity": "basic|intermediate|advanced"
-            }}
-        }}
-        """
+        start_time = time.perf_counter()
         
         try:
             response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=500,
                 temperature=0.1,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                system=_system(CLASSIFY_SYSTEM),
+                messages=_messages(request.text[:CLASSIFY_MAX_CHARS])
             )
             
-            result = json.loads(response.content[0].text)
-            processing_time = time.time() - start_time
-            
+            result = orjson.loads(response.content[0].text)
             return TextProcessingResponse(
                 result=result,
                 confidence=result.get("confidence", 0.0),
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
@@ -66,60 +195,31 @@ class AnthropicTextProvider(TextProvider):
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
     
+    @exact_cached(task="extract")
     async def extract_structured_data(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Extract structured data from text."""
-        start_time = time.time()
-        
-        prompt = f"""
-        Extract structured data from this technical text for S1000D data module creation.
-        
-        Text: {request.text}
-        
-        Respond in JSON format:
-        {{
-            "sections": [
-                {{
-                    "type": "paragraph|list|table|figure",
-                    "title": "section title",
-                    "content": "extracted content",
-                    "level": 1
-                }}
-            ],
-            "references": [
-                {{
-                    "type": "figure|table|dm",
-                    "reference": "Figure 1|Table 1|DMC-XXX",
-                    "title": "reference title"
-                }}
-            ],
-            "warnings": ["safety warning 1", "safety warning 2"],
-            "cautions": ["caution 1", "caution 2"],
-            "notes": ["note 1", "note 2"]
-        }}
-        """
+        start_time = time.perf_counter()
         
         try:
-            response = await self.client.messages.create(
+            content = await _stream_text(
+                self.client,
                 model=self.model,
                 max_tokens=2000,
                 temperature=0.1,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                system=_system(EXTRACT_SYSTEM),
+                messages=_messages(request.text[:EXTRACT_MAX_CHARS])
             )
             
-            result = json.loads(response.content[0].text)
-            processing_time = time.time() - start_time
-            
+            result = orjson.loads(content)
             return TextProcessingResponse(
                 result=result,
                 confidence=0.85,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
@@ -127,54 +227,30 @@ class AnthropicTextProvider(TextProvider):
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
     
+    @exact_cached(task="rewrite")
     async def rewrite_to_ste(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Rewrite text to ASD-STE100 compliance."""
-        start_time = time.time()
-        
-        prompt = f"""
-        Rewrite this technical text to comply with ASD-STE100 (Simplified Technical English) standards.
-        
-        Original text: {request.text}
-        
-        STE Requirements:
-        - Use only approved words from the STE dictionary
-        - Maximum sentence length: 20 words
-        - Use active voice
-        - Use simple present tense
-        - Avoid complex grammatical structures
-        - Use clear, unambiguous language
-        
-        Respond in JSON format:
-        {{
-            "rewritten_text": "STE compliant text",
-            "ste_score": 0.92,
-            "improvements": ["improvement 1", "improvement 2"],
-            "warnings": ["warning if any"]
-        }}
-        """
+        start_time = time.perf_counter()
         
         try:
             response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=1500,
                 temperature=0.1,
-                messages=[
-                    {"role": "user", "content": prompt}
-                ]
+                system=_system(STE_SYSTEM),
+                messages=_messages(request.text)
             )
             
-            result = json.loads(response.content[0].text)
-            processing_time = time.time() - start_time
-            
+            result = orjson.loads(response.content[0].text)
             return TextProcessingResponse(
                 result=result,
                 confidence=result.get("ste_score", 0.0),
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
@@ -182,37 +258,30 @@ class AnthropicTextProvider(TextProvider):
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
 
+    @exact_cached(task="review")
     async def review_module(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Review text for grammar, STE compliance and logical consistency."""
-        start_time = time.time()
-
-        prompt = f"""
-        Review the following S1000D data module content for grammar, clarity and STE compliance.
-        Provide JSON as {{"issues": ["issue1", "issue2"], "suggested_text": "corrected text"}}.
-
-        Content:\n{request.text}
-        """
+        start_time = time.perf_counter()
 
         try:
             response = await self.client.messages.create(
                 model=self.model,
                 max_tokens=1500,
                 temperature=0.1,
-                messages=[{"role": "user", "content": prompt}]
+                system=_system(REVIEW_SYSTEM),
+                messages=_messages(request.text)
             )
 
-            result = json.loads(response.content[0].text)
-            processing_time = time.time() - start_time
-
+            result = orjson.loads(response.content[0].text)
             return TextProcessingResponse(
                 result=result,
                 confidence=1.0,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
@@ -220,7 +289,7 @@ class AnthropicTextProvider(TextProvider):
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
@@ -230,168 +299,104 @@ class AnthropicVisionProvider(VisionProvider):
     """Anthropic vision processing provider."""
 
     def __init__(self, model: str | None = None):
-        self.client = anthropic.AsyncAnthropic(
-            api_key=os.environ.get("ANTHROPIC_API_KEY")
-        )
+        self.client = _get_client()
         self.model = model or os.environ.get("VISION_MODEL", "claude-3-sonnet-20240229")
     
+    @semantic_cached(task="caption")
     async def generate_caption(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         """Generate caption for image."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            response = await self.client.messages.create(
+            caption = await _stream_text(
+                self.client,
                 model=self.model,
                 max_tokens=200,
                 temperature=0.1,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Generate a technical caption for this image suitable for S1000D documentation. Focus on technical accuracy and clarity."
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": request.image_data
-                                }
-                            }
-                        ]
-                    }
-                ]
+                messages=[{"role": "user", "content": _image_content(CAPTION_PROMPT, request)}]
             )
             
-            caption = response.content[0].text
-            processing_time = time.time() - start_time
-            
             return VisionProcessingResponse(
                 caption=caption,
                 confidence=0.85,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
         except Exception as e:
             return VisionProcessingResponse(
                 caption=f"Error generating caption: {str(e)}",
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
     
+    @semantic_cached(task="objects")
     async def detect_objects(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         """Detect objects in image."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            response = await self.client.messages.create(
+            content = await _stream_text(
+                self.client,
                 model=self.model,
                 max_tokens=300,
                 temperature=0.1,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Identify and list all technical objects, components, and parts visible in this image. Return as a JSON array of object names."
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": request.image_data
-                                }
-                            }
-                        ]
-                    }
-                ]
+                messages=[{"role": "user", "content": _image_content(OBJECTS_PROMPT, request)}]
             )
             
-            content = response.content[0].text
-            try:
-                objects = json.loads(content)
-                if not isinstance(objects, list):
-                    objects = [content]
-            except:
+            objects = _json_list(content)
+            if objects is None:
                 objects = [content]
             
-            processing_time = time.time() - start_time
-            
             return VisionProcessingResponse(
                 objects=objects,
                 confidence=0.80,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
         except Exception as e:
             return VisionProcessingResponse(
                 objects=[],
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
     
+    @semantic_cached(task="hotspots")
     async def generate_hotspots(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         """Generate hotspot suggestions."""
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         try:
-            response = await self.client.messages.create(
+            content = await _stream_text(
+                self.client,
                 model=self.model,
                 max_tokens=500,
                 temperature=0.1,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Identify key areas in this technical image that should have interactive hotspots. Return coordinates and descriptions in JSON format: [{\"x\": 100, \"y\": 150, \"width\": 50, \"height\": 30, \"description\": \"component name\"}]"
-                            },
-                            {
-                                "type": "image",
-                                "source": {
-                                    "type": "base64",
-                                    "media_type": "image/jpeg",
-                                    "data": request.image_data
-                                }
-                            }
-                        ]
-                    }
-                ]
+                messages=[{"role": "user", "content": _image_content(HOTSPOTS_PROMPT, request)}]
             )
             
-            content = response.content[0].text
-            try:
-                hotspots = json.loads(content)
-                if not isinstance(hotspots, list):
-                    hotspots = []
-            except:
-                hotspots = []
-            
-            processing_time = time.time() - start_time
+            hotspots = _json_list(content) or []
             
             return VisionProcessingResponse(
                 hotspots=hotspots,
                 confidence=0.75,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
         except Exception as e:
             return VisionProcessingResponse(
                 hotspots=[],
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="anthropic",
                 model_used=self.model
             )
\ No newline at end of file
@@ -1,18 +1,31 @@
 """Base AI provider interfaces."""
 
+import asyncio
+import functools
+import hashlib
+import json
+import logging
+import os
+import time
 from abc import ABC, abstractmethod
-from typing import Dict, Any, List, Optional
-from pydantic import BaseModel
+from typing import Dict, Any, List, Optional, Tuple, Union
 
+import msgspec
+import numpy as np
+import pybase64
+from cachetools import TTLCache
 
-class TextProcessingRequest(BaseModel):
+logger = logging.getLogger(__name__)
+
+
+class TextProcessingRequest(msgspec.Struct):
     """Text processing request model."""
     text: str
     task_type: str  # "classify", "extract", "rewrite"
     context: Dict[str, Any] = {}
 
 
-class TextProcessingResponse(BaseModel):
+class TextProcessingResponse(msgspec.Struct):
     """Text processing response model."""
     result: Dict[str, Any]
     confidence: float = 0.0
@@ -21,14 +34,40 @@ class TextProcessingResponse(BaseModel):
     model_used: str = ""
 
 
-class VisionProcessingRequest(BaseModel):
+# The caption, object and hotspot requests for an image share one bytes object,
+# whose hash CPython caches, so these lookups are cheap after the first call.
+@functools.lru_cache(maxsize=4)
+def _b64encode(data: bytes) -> str:
+    return pybase64.b64encode(data).decode("ascii")
+
+
+@functools.lru_cache(maxsize=4)
+def jpeg_data_url(image_data: Union[str, bytes]) -> str:
+    """Return base64 or raw JPEG image data as a ``data:`` URL."""
+    encoded = _b64encode(image_data) if isinstance(image_data, bytes) else image_data
+    return f"data:image/jpeg;base64,{encoded}"
+
+
+class VisionProcessingRequest(msgspec.Struct):
     """Vision processing request model."""
-    image_data: str  # Base64 encoded image
+    image_data: Union[str, bytes]  # Base64 encoded image or raw image bytes
     task_type: str  # "caption", "objects", "hotspots"
     context: Dict[str, Any] = {}
 
+    def image_base64(self) -> str:
+        """Return the image as a base64 string, encoding raw bytes if needed."""
+        if isinstance(self.image_data, bytes):
+            return _b64encode(self.image_data)
+        return self.image_data
+
+    def image_bytes(self) -> bytes:
+        """Return the raw image bytes, decoding base64 input if needed."""
+        if isinstance(self.image_data, bytes):
+            return self.image_data
+        return pybase64.b64decode(self.image_data, validate=False)
+
 
-class VisionProcessingResponse(BaseModel):
+class VisionProcessingResponse(msgspec.Struct):
     """Vision processing response model."""
     caption: str = ""
     objects: List[str] = []
@@ -37,6 +76,7 @@ class VisionProcessingResponse(BaseModel):
     processing_time: float = 0.0
     provider: str = ""
     model_used: str = ""
+    error: str = ""  # why the provider call failed; empty on success
 
 
 class TextProvider(ABC):
@@ -62,6 +102,21 @@ class TextProvider(ABC):
         """Review text for grammar, STE compliance and logical consistency."""
         pass
 
+    async def classify_batch(
+        self, requests: List[TextProcessingRequest], max_workers: int = 10
+    ) -> List[TextProcessingResponse | BaseException]:
+        """Classify several documents concurrently, at most ``max_workers`` at a time.
+
+        Results are returned in request order; a failed request yields its exception.
+        """
+        semaphore = asyncio.Semaphore(max_workers)
+
+        async def _one(request: TextProcessingRequest) -> TextProcessingResponse:
+            async with semaphore:
+                return await self.classify_document(request)
+
+        return await asyncio.gather(*map(_one, requests), return_exceptions=True)
+
 
 class VisionProvider(ABC):
     """Abstract base class for vision processing providers."""
@@ -79,4 +134,190 @@ class VisionProvider(ABC):
     @abstractmethod
     async def generate_hotspots(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         """Generate hotspot suggestions."""
-        pass
\ No newline at end of file
+        pass
+
+
+class SemanticCache:
+    """In-memory cache of provider responses.
+
+    Text requests are matched on the cosine similarity of their normalised
+    sentence embeddings, image requests exactly on a hash of the decoded bytes.
+    """
+
+    def __init__(self, threshold: float = 0.92, maxsize: int = 1024):
+        self.threshold = threshold
+        self.maxsize = maxsize
+        # Embeddings live in one preallocated (maxsize, dim) matrix used as a
+        # ring buffer, so a lookup is a single matrix-vector product.
+        self._vectors: np.ndarray | None = None
+        self._responses: List[Optional[msgspec.Struct]] = [None] * maxsize
+        self._size = 0
+        self._next = 0
+        self._hashes: Dict[str, msgspec.Struct] = {}
+
+    def search(self, vector: np.ndarray) -> Optional[msgspec.Struct]:
+        """Return the stored response most similar to ``vector`` above the threshold."""
+        if not self._size:
+            return None
+        scores = self._vectors[:self._size] @ vector
+        idx = int(np.argmax(scores))
+        if scores[idx] > self.threshold:
+            return self._responses[idx]
+        return None
+
+    def add(self, vector: np.ndarray, response: msgspec.Struct) -> None:
+        """Store ``response`` under the embedding ``vector``, evicting the oldest entry when full."""
+        vector = np.asarray(vector, dtype=np.float32).ravel()
+        if self._vectors is None:
+            self._vectors = np.empty((self.maxsize, vector.shape[0]), dtype=np.float32)
+        self._vectors[self._next] = vector
+        self._responses[self._next] = response
+        self._next = (self._next + 1) % self.maxsize
+        self._size = min(self._size + 1, self.maxsize)
+
+    def get(self, key: str) -> Optional[msgspec.Struct]:
+        """Return the response stored under an exact ``key``."""
+        return self._hashes.get(key)
+
+    def put(self, key: str, response: msgspec.Struct) -> None:
+        """Store ``response`` under an exact ``key``."""
+        if len(self._hashes) >= self.maxsize:
+            self._hashes.pop(next(iter(self._hashes)))
+        self._hashes[key] = response
+
+
+_SEMANTIC_CACHES: Dict[Tuple[str, str, str], SemanticCache] = {}
+
+
+def get_semantic_cache(provider: str, model: str, task: str, threshold: float = 0.92) -> SemanticCache:
+    """Return the process-wide cache for a provider, model and task."""
+    key = (provider, model, task)
+    if key not in _SEMANTIC_CACHES:
+        _SEMANTIC_CACHES[key] = SemanticCache(threshold=threshold)
+    return _SEMANTIC_CACHES[key]
+
+
+@functools.lru_cache(maxsize=1)
+def _load_embedder():
+    from sentence_transformers import SentenceTransformer
+
+    return SentenceTransformer(os.environ.get("SEMANTIC_CACHE_MODEL", "all-MiniLM-L6-v2"))
+
+
+def embed_texts(texts: List[str], batch_size: int = 32) -> np.ndarray:
+    """Encode ``texts`` into a (len(texts), dim) matrix of normalised embeddings in one pass."""
+    return _load_embedder().encode(
+        texts, batch_size=batch_size, normalize_embeddings=True, show_progress_bar=False
+    )
+
+
+def embed_text(text: str) -> np.ndarray:
+    """Encode ``text`` into a normalised sentence embedding."""
+    return embed_texts([text])[0]
+
+
+def _image_key(request: VisionProcessingRequest) -> str:
+    return hashlib.blake2b(request.image_bytes()).hexdigest()
+
+
+def _is_cacheable(response: msgspec.Struct) -> bool:
+    if isinstance(response, TextProcessingResponse):
+        return "error" not in response.result
+    return response.confidence > 0.0
+
+
+def semantic_cached(task: str, threshold: float = 0.92):
+    """Serve repeat requests for ``task`` from a :class:`SemanticCache`.
+
+    Set ``SEMANTIC_CACHE=0`` to bypass the cache entirely.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            if os.environ.get("SEMANTIC_CACHE", "1") == "0":
+                return await func(self, request)
+            start_time = time.perf_counter()
+            model = getattr(self, "models", {}).get(task) or getattr(self, "model", "")
+            cache = get_semantic_cache(type(self).__name__, model, task, threshold)
+            try:
+                if isinstance(request, VisionProcessingRequest):
+                    key = await asyncio.to_thread(_image_key, request)
+                    cached = cache.get(key)
+                else:
+                    key = await asyncio.to_thread(embed_text, request.text)
+                    cached = cache.search(key)
+            except Exception as e:
+                logger.warning(f"Semantic cache unavailable for {task}: {e}")
+                return await func(self, request)
+
+            if cached is not None:
+                return msgspec.structs.replace(cached, processing_time=time.perf_counter() - start_time)
+
+            response = await func(self, request)
+            if _is_cacheable(response):
+                if isinstance(key, str):
+                    cache.put(key, response)
+                else:
+                    cache.add(key, response)
+            return response
+
+        return wrapper
+
+    return decorator
+
+
+_EXACT_CACHE: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+# Requests currently being computed, so concurrent duplicates wait for the
+# first instead of issuing their own provider call.
+_IN_FLIGHT: Dict[str, asyncio.Future] = {}
+_EXACT_CACHE_STATS = {"hits": 0, "misses": 0}
+
+
+def exact_cache_stats() -> Dict[str, int]:
+    """Return hit and miss counts and the current size of the exact cache."""
+    return {**_EXACT_CACHE_STATS, "size": len(_EXACT_CACHE)}
+
+
+def exact_cache_key(model: str, task: str, text: str) -> str:
+    """Return the SHA-256 key for a model, task and request text."""
+    payload = json.dumps({"m": model, "t": task, "x": text}, sort_keys=True)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def exact_cached(task: str):
+    """Serve byte-identical repeat requests for ``task`` from a TTL cache.
+
+    Concurrent identical requests share a single call to ``func``.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(self, request):
+            start_time = time.perf_counter()
+            model = getattr(self, "models", {}).get(task) or getattr(self, "model", "")
+            key = exact_cache_key(model, task, request.text)
+            cached = _EXACT_CACHE.get(key)
+            if cached is None and key in _IN_FLIGHT:
+                cached = await asyncio.shield(_IN_FLIGHT[key])
+            if cached is not None:
+                _EXACT_CACHE_STATS["hits"] += 1
+                return msgspec.structs.replace(cached, processing_time=time.perf_counter() - start_time)
+
+            _EXACT_CACHE_STATS["misses"] += 1
+            pending = _IN_FLIGHT[key] = asyncio.get_running_loop().create_future()
+            shared = None
+            try:
+                response = await func(self, request)
+                if _is_cacheable(response):
+                    _EXACT_CACHE[key] = shared = response
+                return response
+            finally:
+                # Waiters on a failed or uncacheable call get None and make their own.
+                pending.set_result(shared)
+                if _IN_FLIGHT.get(key) is pending:
+                    del _IN_FLIGHT[key]
+
+        return wrapper
+
+    return decorator
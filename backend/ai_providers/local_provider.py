@@ -1,16 +1,24 @@
 """Local provider implementation using local ML models."""
 
+import asyncio
+import functools
+import hashlib
+from concurrent.futures import ThreadPoolExecutor
 import os
 import time
-import base64
 import io
 import json
-from typing import Dict, Any, List
+import re
+from typing import Dict, Any, List, Set, Tuple
 
+from cachetools import LRUCache
+import numpy as np
 from PIL import Image
 import torch
-from torchvision import models, transforms
-from transformers import pipeline
+from torchvision import models
+from torchvision.io import ImageReadMode, decode_image, decode_jpeg
+from transformers import StoppingCriteria, StoppingCriteriaList, pipeline
+from transformers.utils import is_flash_attn_2_available
 
 from .base import (
     TextProvider,
@@ -19,40 +27,287 @@ from .base import (
     TextProcessingResponse,
     VisionProcessingRequest,
     VisionProcessingResponse,
+    exact_cached,
 )
 
+# Fallback models for direct construction; ProviderFactory passes the
+# current TEXT_MODEL/VISION_MODEL explicitly.
+_DEFAULT_TEXT_MODEL = os.environ.get(
+    "TEXT_MODEL", "Goekdeniz-Guelmez/Josiefied-Qwen3-30B-A3B-abliterated-v2"
+)
+_DEFAULT_VISION_MODEL = os.environ.get("VISION_MODEL", "Qwen/Qwen-VL-Chat")
+
+DM_TYPES = ("PROC", "DESC", "IPD", "CIR", "SNS", "WIR", "GEN")
+
+# Keywords used to guess the data module type when the model output cannot be
+# parsed. All keywords are compiled into one alternation so the text is scanned
+# once; the first keyword found is looked up in _KW_TO_DM.
+DM_TYPE_KEYWORDS = {
+    "PROC": ["procedure", "step", "remove", "install"],
+    "DESC": ["description", "overview", "consists of"],
+    "IPD": ["parts list", "part number", "illustrated parts"],
+    "CIR": ["circuit", "schematic"],
+    "SNS": ["service bulletin", "notice", "inspection"],
+    "WIR": ["wiring", "harness", "connector"],
+}
+_KW_TO_DM: Dict[str, str] = {
+    word: dm_type for dm_type, words in DM_TYPE_KEYWORDS.items() for word in words
+}
+_DM_TYPE_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, _KW_TO_DM)) + ")", re.IGNORECASE
+)
+
+
+def guess_dm_type(text: str) -> str:
+    """Return the data module type of the first keyword in ``text``, else GEN."""
+    match = _DM_TYPE_RE.search(text)
+    return _KW_TO_DM[match.group(0).lower()] if match else "GEN"
+
+
+_JSON_DECODER = json.JSONDecoder()
+
+
+def parse_json_object(text: str) -> Dict[str, Any] | None:
+    """Return the first complete JSON object in generated ``text``, if any.
+
+    Decoding stops at the end of the object, so trailing chatter after it is
+    ignored; an opening brace that does not start valid JSON is skipped.
+    """
+    start = text.find("{")
+    while start != -1:
+        try:
+            return _JSON_DECODER.raw_decode(text, start)[0]
+        except json.JSONDecodeError:
+            start = text.find("{", start + 1)
+    return None
+
+
+class _StopAfterJSONObject(StoppingCriteria):
+    """Stop generating a row once its completion holds a complete JSON object.
+
+    The local prompts ask for a single JSON object and parse_json_object
+    ignores anything after it, so the remaining tokens would be wasted.
+    An instance serves one generate() call: the prompt length is recorded at
+    its first check, which follows the first generated token.
+    """
+
+    def __init__(self, tokenizer):
+        self.tokenizer = tokenizer
+        self.prompt_length: int | None = None
+
+    def __call__(self, input_ids: torch.LongTensor, scores, **kwargs) -> torch.BoolTensor:
+        if self.prompt_length is None:
+            self.prompt_length = input_ids.shape[1] - 1
+        last = self.tokenizer.batch_decode(input_ids[:, -1:])
+        done = [
+            "}" in token
+            and parse_json_object(self.tokenizer.decode(row[self.prompt_length:], skip_special_tokens=True)) is not None
+            for token, row in zip(last, input_ids)
+        ]
+        return torch.tensor(done, dtype=torch.bool, device=input_ids.device)
+
+
+# Common non-STE phrases and their approved replacements, applied in one pass.
+STE_REPLACEMENTS = {
+    "utilize": "use",
+    "approximately": "about",
+    "prior to": "before",
+    "in order to": "to",
+    "subsequent to": "after",
+}
+_STE_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, STE_REPLACEMENTS)) + r")\b", re.IGNORECASE
+)
+
+
+def _ste_replace(match: re.Match) -> str:
+    word = STE_REPLACEMENTS[match.group(0).lower()]
+    return word.capitalize() if match.group(0)[0].isupper() else word
+
+
+def apply_ste_replacements(text: str) -> str:
+    """Replace common non-STE phrases with their approved equivalents."""
+    return _STE_RE.sub(_ste_replace, text)
+
+
+# Model calls block for seconds, so they run on a worker thread instead of the
+# event loop. One worker serialises access to the shared models and GPU.
+_INFERENCE_POOL = ThreadPoolExecutor(max_workers=1, thread_name_prefix="local-inference")
+
+
+async def _run_blocking(fn, *args, **kwargs):
+    """Run a blocking model call on the inference thread."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_INFERENCE_POOL, functools.partial(fn, *args, **kwargs))
+
+
+def _open_image(raw: bytes) -> Image.Image:
+    return Image.open(io.BytesIO(raw)).convert("RGB")
+
+
+_DEVICE = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+_PIPELINE_DEVICE = 0 if torch.cuda.is_available() else -1
+
+
+# Decoded detector inputs keyed by a digest of the image bytes, so calling
+# several vision endpoints on the same image decodes it only once.
+_TENSOR_CACHE: LRUCache = LRUCache(maxsize=16)
+
+
+def _to_device(tensor: torch.Tensor) -> torch.Tensor:
+    """Move a CPU tensor to ``_DEVICE``, staging it in pinned memory for an async copy."""
+    if _DEVICE.type != "cuda":
+        return tensor
+    return tensor.pin_memory().to(_DEVICE, non_blocking=True)
+
+
+# Model weights are loaded once per process and shared by every provider
+# instance; ProviderFactory creates a new provider for each request.
+@functools.lru_cache(maxsize=4)
+def _get_generator(model_name: str):
+    # dtype="auto" loads the checkpoint's stored (usually bf16) weights directly
+    # instead of materialising a float32 copy of the whole model.
+    # Fused attention kernels: FlashAttention-2 when installed on a GPU host,
+    # otherwise PyTorch's scaled_dot_product_attention.
+    attention = "flash_attention_2" if _DEVICE.type == "cuda" and is_flash_attn_2_available() else "sdpa"
+    generator = pipeline(
+        "text-generation",
+        model=model_name,
+        tokenizer=model_name,
+        device=_PIPELINE_DEVICE,
+        dtype="auto",
+        model_kwargs={"attn_implementation": attention},
+    )
+    # Batched generation pads on the left so every prompt ends at the same position.
+    tokenizer = generator.tokenizer
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token_id is None:
+        tokenizer.pad_token_id = tokenizer.eos_token_id
+    return generator
+
+
+@functools.lru_cache(maxsize=1)
+def _get_detector():
+    weights = models.detection.FasterRCNN_ResNet50_FPN_Weights.DEFAULT
+    detector = models.detection.fasterrcnn_resnet50_fpn(weights=weights).eval()
+    if _DEVICE.type == "cpu" and os.environ.get("DETECTOR_QUANTIZE", "0") == "1":
+        # Dynamic INT8 quantisation of the box head's Linear layers, which hold
+        # most of the detector's weights; convolutions stay in FP32.
+        detector = torch.ao.quantization.quantize_dynamic(detector, {torch.nn.Linear}, dtype=torch.qint8)
+    detector = detector.to(_DEVICE)
+    if os.environ.get("DETECTOR_COMPILE", "0") == "1":
+        # The detector's own transform resizes inputs to a fixed scale, so only
+        # the region-proposal stages see data-dependent shapes.
+        detector = torch.compile(detector, dynamic=True)
+    return detector
+
+
+# Concurrent detection requests are grouped into one detector call of up to
+# DETECTOR_MAX_BATCH images, waiting at most DETECTOR_MAX_WAIT seconds.
+DETECTOR_MAX_BATCH = int(os.environ.get("DETECTOR_MAX_BATCH", "8"))
+DETECTOR_MAX_WAIT = float(os.environ.get("DETECTOR_MAX_WAIT_MS", "10")) / 1000
+
+
+class _DetectorBatcher:
+    """Micro-batch single-image detector calls arriving within a short window."""
+
+    def __init__(self, detector, max_batch: int = DETECTOR_MAX_BATCH, max_wait: float = DETECTOR_MAX_WAIT):
+        self.detector = detector
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._pending: List[Tuple[torch.Tensor, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        # The event loop only keeps weak references to tasks, so running
+        # batches are held here until they finish.
+        self._tasks: Set[asyncio.Task] = set()
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    async def predict(self, tensor: torch.Tensor) -> Dict[str, torch.Tensor]:
+        loop = asyncio.get_running_loop()
+        if loop is not self._loop:
+            # The batcher outlives event loops; a timer or pending requests
+            # left by a previous loop would never be flushed.
+            self._loop = loop
+            self._pending = []
+            self._timer = None
+        future = loop.create_future()
+        self._pending.append((tensor, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.max_wait, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    def _infer(self, tensors: List[torch.Tensor]) -> List[Dict[str, torch.Tensor]]:
+        # Faster R-CNN resizes and pads each image internally, so inputs of
+        # different sizes can share a batch.
+        # On GPU the detector runs under FP16 autocast; it is a no-op on CPU.
+        with torch.inference_mode(), torch.autocast("cuda", dtype=torch.float16, enabled=_DEVICE.type == "cuda"):
+            outputs = self.detector(tensors)
+        # Results are copied back on this thread, so callers never block on the GPU.
+        return [{key: value.cpu() for key, value in output.items()} for output in outputs]
+
+    async def _run(self, batch: List[Tuple[torch.Tensor, asyncio.Future]]) -> None:
+        try:
+            outputs = await _run_blocking(self._infer, [tensor for tensor, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), output in zip(batch, outputs):
+            if not future.done():
+                future.set_result(output)
+
+
+@functools.lru_cache(maxsize=1)
+def _get_detector_batcher() -> _DetectorBatcher:
+    return _DetectorBatcher(_get_detector())
+
+
+@functools.lru_cache(maxsize=4)
+def _get_captioner(model_name: str):
+    return pipeline("image-to-text", model=model_name, device=_PIPELINE_DEVICE, dtype="auto")
+
 
 class LocalTextProvider(TextProvider):
     """Local text processing provider using a Hugging Face transformer."""
 
     def __init__(self, model: str | None = None):
-        self.model_name = model or os.environ.get(
-            "TEXT_MODEL",
-            "Goekdeniz-Guelmez/Josiefied-Qwen3-30B-A3B-abliterated-v2",
-        )
-        device = 0 if torch.cuda.is_available() else -1
-        self.generator = pipeline(
-            "text-generation", model=self.model_name, tokenizer=self.model_name, device=device
-        )
-        self.dm_types = ["PROC", "DESC", "IPD", "CIR", "SNS", "WIR", "GEN"]
+        self.model_name = model or _DEFAULT_TEXT_MODEL
+        self.model = self.model_name  # cache key, as on the hosted providers
+        self.generator = _get_generator(self.model_name)
+        self.dm_types = DM_TYPES
 
-    async def classify_document(self, request: TextProcessingRequest) -> TextProcessingResponse:
-        """Classify document type using the local language model."""
-        start_time = time.time()
-        prompt = (
+    def _stop_after_json(self) -> StoppingCriteriaList:
+        return StoppingCriteriaList([_StopAfterJSONObject(self.generator.tokenizer)])
+
+    def _classify_prompt(self, text: str) -> str:
+        return (
             "Classify this text according to S1000D data module types"
             " (PROC, DESC, IPD, CIR, SNS, WIR, GEN)."
             " Respond with JSON like {\"dm_type\":..., \"title\":..., \"confidence\":0.9, \"metadata\":{\"language\":\"en-US\"}}.\nText:\n"
-            + request.text[:1000]
+            + text[:1000]
         )
-        output = self.generator(prompt, max_new_tokens=200, do_sample=False)[0]["generated_text"]
-        json_start = output.find("{")
-        json_end = output.rfind("}") + 1
-        try:
-            result = json.loads(output[json_start:json_end])
+
+    def _classification_response(self, output: str, text: str, start_time: float) -> TextProcessingResponse:
+        # ``output`` holds only the completion (return_full_text=False), so the
+        # example object in the prompt is never mistaken for the answer.
+        result = parse_json_object(output)
+        if result is not None:
             confidence = result.get("confidence", 0.0)
-        except Exception:
-            result = {"dm_type": "GEN", "title": request.text.split(".")[0][:50], "confidence": 0.0, "metadata": {"language": "en-US"}}
+        else:
+            result = {"dm_type": guess_dm_type(text[:1000]), "title": text.partition(".")[0][:50], "confidence": 0.0, "metadata": {"language": "en-US"}}
             confidence = 0.0
         return TextProcessingResponse(
             result=result,
@@ -62,14 +317,67 @@ class LocalTextProvider(TextProvider):
             model_used=self.model_name,
         )
 
+    @exact_cached(task="classify")
+    async def classify_document(self, request: TextProcessingRequest) -> TextProcessingResponse:
+        """Classify document type using the local language model."""
+        start_time = time.time()
+        prompt = self._classify_prompt(request.text)
+        outputs = await _run_blocking(
+            self.generator,
+            prompt,
+            max_new_tokens=200,
+            do_sample=False,
+            return_full_text=False,
+            stopping_criteria=self._stop_after_json(),
+        )
+        return self._classification_response(outputs[0]["generated_text"], request.text, start_time)
+
+    async def classify_batch(
+        self, requests: List[TextProcessingRequest], max_workers: int = 10
+    ) -> List[TextProcessingResponse | BaseException]:
+        """Classify several documents in padded batches of up to ``max_workers`` prompts."""
+        if not requests:
+            return []
+        start_time = time.time()
+        prompts = [self._classify_prompt(request.text) for request in requests]
+        batch_size = min(max_workers, len(prompts))
+
+        def generate() -> List[Any]:
+            # The pipeline would run one generate() per batch with a shared
+            # stopping criterion, so each batch gets its own call and criterion.
+            outputs = []
+            for i in range(0, len(prompts), batch_size):
+                outputs.extend(
+                    self.generator(
+                        prompts[i:i + batch_size],
+                        batch_size=batch_size,
+                        max_new_tokens=200,
+                        do_sample=False,
+                        return_full_text=False,
+                        stopping_criteria=self._stop_after_json(),
+                    )
+                )
+            return outputs
+
+        try:
+            outputs = await _run_blocking(generate)
+        except Exception as e:
+            return [e] * len(requests)
+        return [
+            self._classification_response(output[0]["generated_text"], request.text, start_time)
+            for request, output in zip(requests, outputs)
+        ]
+
     async def extract_structured_data(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Extract simple sections and references from text."""
         start_time = time.time()
-        lines = request.text.splitlines()
         sections: List[Dict[str, Any]] = []
+        refs: List[Dict[str, Any]] = []
         current = []
-        for line in lines:
-            if not line.strip():
+        # Sections and references are collected in the same pass over the lines.
+        for line in request.text.splitlines():
+            stripped = line.strip()
+            if not stripped:
                 if current:
                     sections.append({
                         "type": "paragraph",
@@ -79,15 +387,19 @@ class LocalTextProvider(TextProvider):
                     })
                     current = []
                 continue
-            if line.lstrip().startswith(('-', '*', '+')):
+            if stripped.startswith(('-', '*', '+')):
                 sections.append({
                     "type": "list",
                     "title": f"List {len(sections)+1}",
-                    "content": line.strip(),
+                    "content": stripped,
                     "level": 1,
                 })
             else:
-                current.append(line.strip())
+                current.append(stripped)
+            if "Figure" in stripped:
+                refs.append({"type": "figure", "reference": stripped, "title": ""})
+            if "DMC-" in stripped:
+                refs.append({"type": "dm", "reference": stripped, "title": ""})
         if current:
             sections.append({
                 "type": "paragraph",
@@ -95,12 +407,6 @@ class LocalTextProvider(TextProvider):
                 "content": " ".join(current),
                 "level": 1,
             })
-        refs = []
-        for line in lines:
-            if "Figure" in line:
-                refs.append({"type": "figure", "reference": line.strip(), "title": ""})
-            if "DMC-" in line:
-                refs.append({"type": "dm", "reference": line.strip(), "title": ""})
         result = {
             "sections": sections,
             "references": refs,
@@ -116,6 +422,7 @@ class LocalTextProvider(TextProvider):
             model_used=self.model_name,
         )
 
+    @exact_cached(task="rewrite")
     async def rewrite_to_ste(self, request: TextProcessingRequest) -> TextProcessingResponse:
         """Rewrite text to ASD-STE100 using the language model."""
         start_time = time.time()
@@ -124,15 +431,21 @@ class LocalTextProvider(TextProvider):
             " Respond in JSON with fields rewritten_text, ste_score, improvements, warnings.\nText:\n"
             + request.text
         )
-        output = self.generator(prompt, max_new_tokens=300, do_sample=False)[0]["generated_text"]
-        json_start = output.find("{")
-        json_end = output.rfind("}") + 1
-        try:
-            result = json.loads(output[json_start:json_end])
+        outputs = await _run_blocking(
+            self.generator,
+            prompt,
+            max_new_tokens=300,
+            do_sample=False,
+            return_full_text=False,
+            stopping_criteria=self._stop_after_json(),
+        )
+        output = outputs[0]["generated_text"]
+        result = parse_json_object(output)
+        if result is not None:
             confidence = result.get("ste_score", 0.0)
-        except Exception:
+        else:
             result = {
-                "rewritten_text": request.text,
+                "rewritten_text": apply_ste_replacements(request.text),
                 "ste_score": 0.0,
                 "improvements": [],
                 "warnings": ["parse_failed"],
@@ -150,7 +463,8 @@ class LocalTextProvider(TextProvider):
         """Basic local review returning the original text as suggestion."""
         start_time = time.time()
         issues = []
-        if len(request.text.split()) > 200:
+        # maxsplit stops tokenising once the limit is known to be exceeded.
+        if len(request.text.split(maxsplit=200)) > 200:
             issues.append("module too long for local review")
         return TextProcessingResponse(
             result={"issues": issues, "suggested_text": request.text},
@@ -166,33 +480,56 @@ class LocalVisionProvider(VisionProvider):
 
     def __init__(self, model: str | None = None):
         self.weights = models.detection.FasterRCNN_ResNet50_FPN_Weights.DEFAULT
-        self.detector = models.detection.fasterrcnn_resnet50_fpn(weights=self.weights)
-        self.detector.eval()
-        self.transform = transforms.Compose([transforms.ToTensor()])
-        self.model_name = model or os.environ.get("VISION_MODEL", "Qwen/Qwen-VL-Chat")
-        device = 0 if torch.cuda.is_available() else -1
-        self.captioner = pipeline("image-to-text", model=self.model_name, device=device)
-
-    def _predict(self, image: Image.Image):
-        tensor = self.transform(image)
-        with torch.no_grad():
-            output = self.detector([tensor])[0]
-        return output
+        self.detector = _get_detector()
+        self.batcher = _get_detector_batcher()
+        self.model_name = model or _DEFAULT_VISION_MODEL
+        self.captioner = _get_captioner(self.model_name)
+
+    def _to_tensor(self, raw: bytes) -> torch.Tensor:
+        """Decode image bytes into a float RGB tensor on the detector's device.
+
+        JPEGs are decoded on the GPU when one is available; formats torchvision
+        cannot decode fall back to PIL. Recently decoded images are reused.
+        """
+        key = hashlib.blake2b(raw, digest_size=16).digest()
+        tensor = _TENSOR_CACHE.get(key)
+        if tensor is None:
+            tensor = _TENSOR_CACHE[key] = self._decode(raw)
+        return tensor
+
+    @staticmethod
+    def _decode(raw: bytes) -> torch.Tensor:
+        data = torch.frombuffer(bytearray(raw), dtype=torch.uint8)
+        try:
+            if _DEVICE.type == "cuda" and raw[:3] == b"\xff\xd8\xff":
+                image = decode_jpeg(data, mode=ImageReadMode.RGB, device=_DEVICE)
+            else:
+                image = _to_device(decode_image(data, mode=ImageReadMode.RGB))
+        except RuntimeError:
+            array = np.array(_open_image(raw))
+            image = _to_device(torch.from_numpy(array).permute(2, 0, 1).contiguous())
+        return image.float().div_(255.0)
+
+    async def _predict(self, raw: bytes) -> Dict[str, torch.Tensor]:
+        return await self.batcher.predict(await _run_blocking(self._to_tensor, raw))
 
     async def generate_caption(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         """Generate caption using a local vision-language model."""
         start_time = time.time()
-        image_data = base64.b64decode(request.image_data)
-        image = Image.open(io.BytesIO(image_data)).convert("RGB")
+        image = await _run_blocking(_open_image, request.image_bytes())
         try:
-            caption = self.captioner(image)[0]["generated_text"].strip()
+            outputs = await _run_blocking(self.captioner, image)
+            caption = outputs[0]["generated_text"].strip()
             confidence = 0.9
+            error = ""
         except Exception as e:
             caption = f"Error: {e}"
             confidence = 0.0
+            error = str(e)
         return VisionProcessingResponse(
             caption=caption,
             confidence=confidence,
+            error=error,
             processing_time=time.time() - start_time,
             provider="local",
             model_used=self.model_name,
@@ -200,10 +537,9 @@ class LocalVisionProvider(VisionProvider):
 
     async def detect_objects(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         start_time = time.time()
-        image_data = base64.b64decode(request.image_data)
-        image = Image.open(io.BytesIO(image_data)).convert("RGB")
-        output = self._predict(image)
-        labels = [self.weights.meta['categories'][int(i)] for i in output['labels']]
+        output = await self._predict(request.image_bytes())
+        categories = self.weights.meta['categories']
+        labels = [categories[i] for i in output['labels'].tolist()]
         return VisionProcessingResponse(
             objects=labels,
             confidence=float(output['scores'].max().item()) if len(output['scores']) > 0 else 0.0,
@@ -214,19 +550,15 @@ class LocalVisionProvider(VisionProvider):
 
     async def generate_hotspots(self, request: VisionProcessingRequest) -> VisionProcessingResponse:
         start_time = time.time()
-        image_data = base64.b64decode(request.image_data)
-        image = Image.open(io.BytesIO(image_data)).convert("RGB")
-        output = self._predict(image)
-        hotspots = []
-        for box, label in zip(output['boxes'], output['labels']):
-            x1, y1, x2, y2 = [int(v) for v in box.tolist()]
-            hotspots.append({
-                "x": x1,
-                "y": y1,
-                "width": x2 - x1,
-                "height": y2 - y1,
-                "description": self.weights.meta['categories'][int(label)],
-            })
+        output = await self._predict(request.image_bytes())
+        # Boxes become (x, y, width, height) rows in one tensor op and one tolist().
+        boxes = output['boxes'].to(torch.int64)
+        boxes[:, 2:] -= boxes[:, :2]
+        categories = self.weights.meta['categories']
+        hotspots = [
+            {"x": x, "y": y, "width": w, "height": h, "description": categories[label]}
+            for (x, y, w, h), label in zip(boxes.tolist(), output['labels'].tolist())
+        ]
         return VisionProcessingResponse(
             hotspots=hotspots,
             confidence=float(output['scores'].max().item()) if len(output['scores']) > 0 else 0.0,
@@ -2,14 +2,19 @@
 
 import asyncio
 import base64
-import json
+import functools
+import io
 import os
 import time
 from pathlib import Path
 from typing import Any, Dict, List
 
+import httpx
 import openai
+import orjson
+import pybase64
 from dotenv import load_dotenv
+from PIL import Image
 
 from .base import (
     TextProcessingRequest,
@@ -18,6 +23,9 @@ from .base import (
     VisionProcessingRequest,
     VisionProcessingResponse,
     VisionProvider,
+    exact_cached,
+    jpeg_data_url,
+    semantic_cached,
 )
 
 # Ensure environment variables are loaded even if the server did not call
@@ -27,224 +35,369 @@ from .base import (
 load_dotenv(Path(__file__).resolve().parents[1] / ".env", override=True)
 
 
+# Input caps: classification only needs the opening of a document, and
+# extraction output is bounded by max_tokens, so larger inputs only add cost.
+CLASSIFY_MAX_CHARS = 2000
+EXTRACT_MAX_CHARS = 50_000
+
+# Static instructions go in the system message and the request text in the user
+# message, so every call shares the same prompt prefix and OpenAI's automatic
+# prompt caching can serve it.
+
+# Schemas are given on one line and the model is asked for minified JSON, which
+# keeps both the prompt and the (slower, decode-bound) output short.
+CLASSIFY_SYSTEM = (
+    "Classify the user's text according to S1000D data module types.\n"
+    "Respond with minified JSON: "
+    '{"dm_type":"PROC|DESC|IPD|CIR|SNS|WIR|GEN","title":"extracted title","confidence":0.95,'
+    '"metadata":{"language":"en-US","technical_domain":"aviation|electronics|mechanical|general",'
+    '"complexity":"basic|intermediate|advanced"}}'
+)
+
+CLASSIFY_BATCH_SYSTEM = (
+    "Classify each numbered document in the user's message according to S1000D data module types.\n"
+    "Respond with minified JSON holding one result per document, in order: "
+    '{"results":[{"dm_type":"PROC|DESC|IPD|CIR|SNS|WIR|GEN","title":"extracted title","confidence":0.95,'
+    '"metadata":{"language":"en-US","technical_domain":"aviation|electronics|mechanical|general",'
+    '"complexity":"basic|intermediate|advanced"}}]}'
+)
+
+EXTRACT_SYSTEM = (
+    "Extract structured data from the user's technical text for S1000D data module creation.\n"
+    "Respond with minified JSON: "
+    '{"sections":[{"type":"paragraph|list|table|figure","title":"","content":"","level":1}],'
+    '"references":[{"type":"figure|table|dm","reference":"Figure 1|Table 1|DMC-XXX","title":""}],'
+    '"warnings":[""],"cautions":[""],"notes":[""]}'
+)
+
+STE_SYSTEM = (
+    "Rewrite the user's technical text to comply with ASD-STE100 (Simplified Technical English): "
+    "approved STE dictionary words only, at most 20 words per sentence, active voice, simple present tense, "
+    "simple grammar, clear and unambiguous language.\n"
+    'Respond with minified JSON: {"rewritten_text":"","ste_score":0.92,"warnings":[""]}'
+)
+
+REVIEW_SYSTEM = (
+    "Review the user's S1000D data module content for grammar, clarity and STE compliance.\n"
+    'Respond with minified JSON: {"issues":[""],"suggested_text":"corrected text"}'
+)
+
+CAPTION_PROMPT = (
+    "Generate a technical caption for this image suitable for S1000D documentation. "
+    "Focus on technical accuracy and clarity."
+)
+OBJECTS_PROMPT = (
+    "Identify and list all technical objects, components, and parts visible in this image. "
+    'Return JSON as {"objects": ["object name"]}.'
+)
+HOTSPOTS_PROMPT = (
+    "Identify key areas in this technical image that should have interactive hotspots. "
+    "Return coordinates and descriptions in JSON format: "
+    '{"hotspots": [{"x": 100, "y": 150, "width": 50, "height": 30, "description": "component name"}]}'
+)
+
+
+def _api_key() -> str:
+    api_key = os.environ.get("OPENAI_API_KEY")
+    if not api_key:
+        raise RuntimeError(
+            "OPENAI_API_KEY environment variable not set. "
+            "Ensure it is defined in backend/.env or the execution environment."
+        )
+    return api_key
+
+
+@functools.lru_cache(maxsize=4)
+def _get_client(api_key: str) -> openai.AsyncOpenAI:
+    """Return the process-wide client for ``api_key`` so providers share one connection pool."""
+    # HTTP/2 multiplexes concurrent requests over one TLS connection. The SDK
+    # retries rate limits, 5xx and connection errors with jittered backoff.
+    return openai.AsyncOpenAI(
+        api_key=api_key,
+        max_retries=4,
+        http_client=openai.DefaultAsyncHttpxClient(
+            http2=True,
+            limits=httpx.Limits(max_keepalive_connections=50, max_connections=100),
+            timeout=httpx.Timeout(60.0, connect=5.0),
+        ),
+    )
+
+
+# OpenAI bills vision input per 512px tile, so larger images are downscaled to
+# this longest side and re-encoded as JPEG before upload.
+MAX_IMAGE_SIDE = int(os.environ.get("OPENAI_MAX_IMAGE_SIDE", "1024"))
+
+@functools.lru_cache(maxsize=4)
+def _fit_image(image_data: str | bytes) -> str:
+    raw = image_data if isinstance(image_data, bytes) else pybase64.b64decode(image_data, validate=False)
+    with Image.open(io.BytesIO(raw)) as image:
+        if max(image.size) <= MAX_IMAGE_SIDE:
+            return jpeg_data_url(image_data)
+        image.thumbnail((MAX_IMAGE_SIDE, MAX_IMAGE_SIDE))
+        buffer = io.BytesIO()
+        image.convert("RGB").save(buffer, "JPEG", quality=80, optimize=True)
+    return jpeg_data_url(buffer.getvalue())
+
+
+# Images being fitted right now. The caption, object and hotspot calls for one
+# image share a single resize, while different images resize in parallel.
+_FITTING: Dict[str | bytes, asyncio.Future] = {}
+
+
+async def _upload_url(request: VisionProcessingRequest) -> str:
+    """Return the data URL to upload for ``request``, downscaling large images off the event loop."""
+    image_data = request.image_data
+    fitting = _FITTING.get(image_data)
+    if fitting is None:
+        fitting = _FITTING[image_data] = asyncio.ensure_future(asyncio.to_thread(_fit_image, image_data))
+        fitting.add_done_callback(lambda _: _FITTING.pop(image_data, None))
+    return await asyncio.shield(fitting)
+
+
+async def _image_messages(prompt: str, request: VisionProcessingRequest) -> List[Dict[str, Any]]:
+    """Build chat messages pairing a static vision prompt with the request image."""
+    return [
+        {
+            "role": "user",
+            "content": [
+                {"type": "text", "text": prompt},
+                {"type": "image_url", "image_url": {"url": await _upload_url(request)}},
+            ],
+        }
+    ]
+
+
+# JSON mode guarantees the reply parses as one JSON object; the prompts must
+# mention JSON, and array results are wrapped in an object key.
+JSON_MODE = {"type": "json_object"}
+
+
+# Replies longer than this are parsed on a worker thread so a large extraction
+# result does not stall other requests on the event loop.
+OFFLOAD_PARSE_CHARS = 4096
+
+
+async def _loads(content: str) -> Any:
+    """Parse a JSON reply, off the event loop when it is large."""
+    if len(content) < OFFLOAD_PARSE_CHARS:
+        return orjson.loads(content)
+    return await asyncio.to_thread(orjson.loads, content)
+
+
+async def _stream_text(client: openai.AsyncOpenAI, **kwargs) -> str:
+    """Stream a chat completion and return the concatenated text once it completes."""
+    chunks: List[str] = []
+    async for chunk in await client.chat.completions.create(stream=True, **kwargs):
+        if chunk.choices:
+            chunks.append(chunk.choices[0].delta.content or "")
+    return "".join(chunks)
+
+
+def _messages(system: str, text: str) -> List[Dict[str, str]]:
+    """Build chat messages with the static instructions ahead of the request text."""
+    return [{"role": "system", "content": system}, {"role": "user", "content": text}]
+
+
 class OpenAITextProvider(TextProvider):
     """OpenAI text processing provider."""
 
-    def __init__(self, model: str | None = None):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError(
-                "OPENAI_API_KEY environment variable not set. "
-                "Ensure it is defined in backend/.env or the execution environment."
-            )
-        self.client = openai.AsyncOpenAI(api_key=api_key)
-        self.model = model or os.environ.get("TEXT_MODEL", "gpt-4o-mini")
+    # Tasks that may run on their own model, e.g. a cheaper one for classification.
+    TASKS = ("classify", "extract", "rewrite", "review")
 
+    def __init__(self, model: str | None = None, models: Dict[str, str] | None = None):
+        """Use ``model`` for every task unless ``models`` or ``TEXT_MODEL_<TASK>`` names one."""
+        self.client = _get_client(_api_key())
+        self.model = model or os.environ.get("TEXT_MODEL", "gpt-4o-mini")
+        models = models or {}
+        self.models = {
+            task: models.get(task) or os.environ.get(f"TEXT_MODEL_{task.upper()}") or self.model
+            for task in self.TASKS
+        }
+
+    @exact_cached(task="classify")
+    @semantic_cached(task="classify")
     async def classify_document(
         self, request: TextProcessingRequest
     ) -> TextProcessingResponse:
         """Classify document type and extract basic metadata."""
-        start_time = time.time()
-
-        prompt = f"""
-        Analyze this text and classify it according to S1000D data module types.
-        
-        Text: {request.text[:2000]}...
-        
-        Respond in JSON format:
-        {{
-            "dm_type": "PROC|DESC|IPD|CIR|SNS|WIR|GEN",
-            "title": "extracted title",
-            "confidence": 0.95,
-            "metadata": {{
-                "language": "en-US",
-                "technical_domain": "aviation|electronics|mechanical|general",
-                "complexity": "basic|intermediate|advanced"
-            }}
-        }}
-        """
+        start_time = time.perf_counter()
 
         try:
             response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                model=self.models["classify"],
+                messages=_messages(CLASSIFY_SYSTEM, request.text[:CLASSIFY_MAX_CHARS]),
                 temperature=0.1,
                 max_tokens=500,
+                response_format=JSON_MODE,
             )
 
-            result = json.loads(response.choices[0].message.content)
-            processing_time = time.time() - start_time
+            result = await _loads(response.choices[0].message.content)
 
             return TextProcessingResponse(
                 result=result,
                 confidence=result.get("confidence", 0.0),
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["classify"],
             )
         except Exception as e:
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["classify"],
             )
 
+    async def classify_batch(
+        self, requests: List[TextProcessingRequest], max_workers: int = 10
+    ) -> List[TextProcessingResponse | BaseException]:
+        """Classify documents ``max_workers`` at a time, one chat completion per group.
+
+        A group whose reply does not hold one result per document falls back to
+        classifying its documents individually.
+        """
+        groups = [requests[i:i + max_workers] for i in range(0, len(requests), max_workers)]
+        results = await asyncio.gather(*map(self._classify_group, groups), return_exceptions=True)
+        responses: List[TextProcessingResponse | BaseException] = []
+        for group, result in zip(groups, results):
+            responses.extend([result] * len(group) if isinstance(result, BaseException) else result)
+        return responses
+
+    async def _classify_group(
+        self, requests: List[TextProcessingRequest]
+    ) -> List[TextProcessingResponse | BaseException]:
+        start_time = time.perf_counter()
+        documents = "\n\n".join(
+            f"Document {i}:\n{request.text[:CLASSIFY_MAX_CHARS]}" for i, request in enumerate(requests, 1)
+        )
+        response = await self.client.chat.completions.create(
+            model=self.models["classify"],
+            messages=_messages(CLASSIFY_BATCH_SYSTEM, documents),
+            temperature=0.1,
+            max_tokens=300 * len(requests),
+            response_format=JSON_MODE,
+        )
+        results = (await _loads(response.choices[0].message.content)).get("results")
+        if (
+            not isinstance(results, list)
+            or len(results) != len(requests)
+            or not all(isinstance(result, dict) for result in results)
+        ):
+            return await super().classify_batch(requests, max_workers=len(requests))
+        processing_time = time.perf_counter() - start_time
+        return [
+            TextProcessingResponse(
+                result=result,
+                confidence=result.get("confidence", 0.0),
+                processing_time=processing_time,
+                provider="openai",
+                model_used=self.models["classify"],
+            )
+            for result in results
+        ]
+
+    @exact_cached(task="extract")
     async def extract_structured_data(
         self, request: TextProcessingRequest
     ) -> TextProcessingResponse:
         """Extract structured data from text."""
-        start_time = time.time()
-
-        prompt = f"""
-        Extract structured data from this technical text for S1000D data module creation.
-        
-        Text: {request.text}
-        
-        Respond in JSON format:
-        {{
-            "sections": [
-                {{
-                    "type": "paragraph|list|table|figure",
-                    "title": "section title",
-                    "content": "extracted content",
-                    "level": 1
-                }}
-            ],
-            "references": [
-                {{
-                    "type": "figure|table|dm",
-                    "reference": "Figure 1|Table 1|DMC-XXX",
-                    "title": "reference title"
-                }}
-            ],
-            "warnings": ["safety warning 1", "safety warning 2"],
-            "cautions": ["caution 1", "caution 2"],
-            "notes": ["note 1", "note 2"]
-        }}
-        """
+        start_time = time.perf_counter()
 
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+            content = await _stream_text(
+                self.client,
+                model=self.models["extract"],
+                messages=_messages(EXTRACT_SYSTEM, request.text[:EXTRACT_MAX_CHARS]),
                 temperature=0.1,
                 max_tokens=2000,
+                response_format=JSON_MODE,
             )
 
-            result = json.loads(response.choices[0].message.content)
-            processing_time = time.time() - start_time
+            result = await _loads(content)
 
             return TextProcessingResponse(
                 result=result,
                 confidence=0.85,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["extract"],
             )
         except Exception as e:
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["extract"],
             )
 
+    @exact_cached(task="rewrite")
     async def rewrite_to_ste(
         self, request: TextProcessingRequest
     ) -> TextProcessingResponse:
         """Rewrite text to ASD-STE100 compliance."""
-        start_time = time.time()
-
-        prompt = f"""
-        Rewrite this technical text to comply with ASD-STE100 (Simplified Technical English) standards.
-        
-        Original text: {request.text}
-        
-        STE Requirements:
-        - Use only approved words from the STE dictionary
-        - Maximum sentence length: 20 words
-        - Use active voice
-        - Use simple present tense
-        - Avoid complex grammatical structures
-        - Use clear, unambiguous language
-        
-        Respond in JSON format:
-        {{
-            "rewritten_text": "STE compliant text",
-            "ste_score": 0.92,
-            "improvements": ["improvement 1", "improvement 2"],
-            "warnings": ["warning if any"]
-        }}
-        """
+        start_time = time.perf_counter()
 
         try:
             response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                model=self.models["rewrite"],
+                messages=_messages(STE_SYSTEM, request.text),
                 temperature=0.1,
                 max_tokens=1500,
+                response_format=JSON_MODE,
             )
 
-            result = json.loads(response.choices[0].message.content)
-            processing_time = time.time() - start_time
+            result = await _loads(response.choices[0].message.content)
 
             return TextProcessingResponse(
                 result=result,
                 confidence=result.get("ste_score", 0.0),
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["rewrite"],
             )
         except Exception as e:
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["rewrite"],
             )
 
+    @exact_cached(task="review")
     async def review_module(
         self, request: TextProcessingRequest
     ) -> TextProcessingResponse:
         """Review text for grammar, STE compliance and logical consistency."""
-        start_time = time.time()
-
-        prompt = f"""
-        Review the following S1000D data module content for grammar, clarity and STE compliance.
-        Provide JSON as {{"issues": ["issue1", "issue2"], "suggested_text": "corrected text"}}.
-
-        Content:\n{request.text}
-        """
+        start_time = time.perf_counter()
 
         try:
             response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[{"role": "user", "content": prompt}],
+                model=self.models["review"],
+                messages=_messages(REVIEW_SYSTEM, request.text),
                 temperature=0.1,
                 max_tokens=1500,
+                response_format=JSON_MODE,
             )
 
-            result = json.loads(response.choices[0].message.content)
-            processing_time = time.time() - start_time
+            result = await _loads(response.choices[0].message.content)
 
             return TextProcessingResponse(
                 result=result,
                 confidence=1.0,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["review"],
             )
         except Exception as e:
             return TextProcessingResponse(
                 result={"error": str(e)},
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
-                model_used=self.model,
+                model_used=self.models["review"],
             )
 
 
@@ -252,172 +405,110 @@ class OpenAIVisionProvider(VisionProvider):
     """OpenAI vision processing provider."""
 
     def __init__(self, model: str | None = None):
-        api_key = os.environ.get("OPENAI_API_KEY")
-        if not api_key:
-            raise RuntimeError(
-                "OPENAI_API_KEY environment variable not set. "
-                "Ensure it is defined in backend/.env or the execution environment."
-            )
-        self.client = openai.AsyncOpenAI(api_key=api_key)
+        self.client = _get_client(_api_key())
         self.model = model or os.environ.get("VISION_MODEL", "gpt-4o-mini")
 
+    @semantic_cached(task="caption")
     async def generate_caption(
         self, request: VisionProcessingRequest
     ) -> VisionProcessingResponse:
         """Generate caption for image."""
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            response = await self.client.chat.completions.create(
+            caption = await _stream_text(
+                self.client,
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Generate a technical caption for this image suitable for S1000D documentation. Focus on technical accuracy and clarity.",
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{request.image_data}"
-                                },
-                            },
-                        ],
-                    }
-                ],
+                messages=await _image_messages(CAPTION_PROMPT, request),
                 temperature=0.1,
                 max_tokens=200,
             )
 
-            caption = response.choices[0].message.content
-            processing_time = time.time() - start_time
-
             return VisionProcessingResponse(
                 caption=caption,
                 confidence=0.85,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
         except Exception as e:
             return VisionProcessingResponse(
                 caption=f"Error generating caption: {str(e)}",
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
 
+    @semantic_cached(task="objects")
     async def detect_objects(
         self, request: VisionProcessingRequest
     ) -> VisionProcessingResponse:
         """Detect objects in image."""
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            response = await self.client.chat.completions.create(
+            content = await _stream_text(
+                self.client,
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": "Identify and list all technical objects, components, and parts visible in this image. Return as a JSON array of object names.",
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{request.image_data}"
-                                },
-                            },
-                        ],
-                    }
-                ],
+                messages=await _image_messages(OBJECTS_PROMPT, request),
                 temperature=0.1,
                 max_tokens=300,
+                response_format=JSON_MODE,
             )
 
-            content = response.choices[0].message.content
-            try:
-                objects = json.loads(content)
-                if not isinstance(objects, list):
-                    objects = [content]
-            except:
-                objects = [content]
-
-            processing_time = time.time() - start_time
+            objects = (await _loads(content)).get("objects", [])
 
             return VisionProcessingResponse(
                 objects=objects,
                 confidence=0.80,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
         except Exception as e:
             return VisionProcessingResponse(
                 objects=[],
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
 
+    @semantic_cached(task="hotspots")
     async def generate_hotspots(
         self, request: VisionProcessingRequest
     ) -> VisionProcessingResponse:
         """Generate hotspot suggestions."""
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         try:
-            response = await self.client.chat.completions.create(
+            content = await _stream_text(
+                self.client,
                 model=self.model,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": [
-                            {
-                                "type": "text",
-                                "text": 'Identify key areas in this technical image that should have interactive hotspots. Return coordinates and descriptions in JSON format: [{"x": 100, "y": 150, "width": 50, "height": 30, "description": "component name"}]',
-                            },
-                            {
-                                "type": "image_url",
-                                "image_url": {
-                                    "url": f"data:image/jpeg;base64,{request.image_data}"
-                                },
-                            },
-                        ],
-                    }
-                ],
+                messages=await _image_messages(HOTSPOTS_PROMPT, request),
                 temperature=0.1,
                 max_tokens=500,
+                response_format=JSON_MODE,
             )
 
-            content = response.choices[0].message.content
-            try:
-                hotspots = json.loads(content)
-                if not isinstance(hotspots, list):
-                    hotspots = []
-            except:
-                hotspots = []
-
-            processing_time = time.time() - start_time
+            hotspots = (await _loads(content)).get("hotspots", [])
 
             return VisionProcessingResponse(
                 hotspots=hotspots,
                 confidence=0.75,
-                processing_time=processing_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
         except Exception as e:
             return VisionProcessingResponse(
                 hotspots=[],
+                error=str(e),
                 confidence=0.0,
-                processing_time=time.time() - start_time,
+                processing_time=time.perf_counter() - start_time,
                 provider="openai",
                 model_used=self.model,
             )
@@ -1,11 +1,95 @@
 """AI Provider Factory for creating text and vision providers."""
 
+import functools
+import importlib
 import os
+import sys
+import types
 from typing import Tuple
 from .base import TextProvider, VisionProvider
-from .openai_provider import OpenAITextProvider, OpenAIVisionProvider
-from .anthropic_provider import AnthropicTextProvider, AnthropicVisionProvider
-from .local_provider import LocalTextProvider, LocalVisionProvider
+
+# Provider names read from the environment are lower-cased and interned once,
+# so the many lookups keyed on them hash and compare shared string objects.
+_OPENAI = sys.intern("openai")
+_ANTHROPIC = sys.intern("anthropic")
+_LOCAL = sys.intern("local")
+
+# Provider modules are imported on first use, so a deployment that only talks
+# to a hosted API never pays for loading torch and transformers.
+_PROVIDER_MODULES = {
+    _OPENAI: ("openai_provider", "OpenAI"),
+    _ANTHROPIC: ("anthropic_provider", "Anthropic"),
+    _LOCAL: ("local_provider", "Local"),
+}
+
+_PROVIDER_NAMES = tuple(_PROVIDER_MODULES)
+# Read-only, so every caller can share the same object.
+_AVAILABLE_PROVIDERS = types.MappingProxyType({"text": _PROVIDER_NAMES, "vision": _PROVIDER_NAMES})
+
+_MISSING_KEY_ERRORS = {
+    _OPENAI: "OpenAI API key not configured",
+    _ANTHROPIC: "Anthropic API key not configured",
+}
+
+
+@functools.cache
+def _resolve(provider_type: str, kind: str) -> type:
+    """Import and return the ``kind`` ("Text" or "Vision") class for ``provider_type``."""
+    module_name, prefix = _PROVIDER_MODULES[provider_type]
+    module = importlib.import_module(f".{module_name}", __package__)
+    return getattr(module, f"{prefix}{kind}Provider")
+
+
+@functools.lru_cache(maxsize=1)
+def _env_snapshot() -> types.SimpleNamespace:
+    """Read the provider settings from the environment once.
+
+    Call :meth:`ProviderFactory.refresh_env` after changing them.
+    """
+    return types.SimpleNamespace(
+        text_provider=sys.intern(os.environ.get("TEXT_PROVIDER", _OPENAI).lower()),
+        vision_provider=sys.intern(os.environ.get("VISION_PROVIDER", _OPENAI).lower()),
+        text_model=os.environ.get("TEXT_MODEL"),
+        vision_model=os.environ.get("VISION_MODEL"),
+        openai_key=os.environ.get("OPENAI_API_KEY"),
+        anthropic_key=os.environ.get("ANTHROPIC_API_KEY"),
+    )
+
+
+# Providers are stateless apart from their clients and model handles, so one
+# instance per (provider, model) serves every request.
+@functools.lru_cache(maxsize=8)
+def _get_text(provider_type: str, model: str | None) -> TextProvider:
+    return _resolve(provider_type, "Text")(model=model)
+
+
+@functools.lru_cache(maxsize=8)
+def _get_vision(provider_type: str, model: str | None) -> VisionProvider:
+    return _resolve(provider_type, "Vision")(model=model)
+
+
+@functools.lru_cache(maxsize=1)
+def _provider_config() -> types.MappingProxyType:
+    env = _env_snapshot()
+    config = {
+        "text_provider": env.text_provider,
+        "vision_provider": env.vision_provider,
+        "text_model": env.text_model or "",
+        "vision_model": env.vision_model or "",
+        "openai_available": bool(env.openai_key),
+        "anthropic_available": bool(env.anthropic_key),
+        "local_available": True  # Always available (mock)
+    }
+
+    # Validate current configuration
+    for kind in ("text", "vision"):
+        provider = config[f"{kind}_provider"]
+        error = _MISSING_KEY_ERRORS.get(provider)
+        valid = error is None or config[f"{provider}_available"]
+        config[f"{kind}_provider_valid"] = valid
+        config[f"{kind}_provider_error"] = None if valid else error
+
+    return types.MappingProxyType(config)
 
 
 class ProviderFactory:
@@ -15,35 +99,25 @@ class ProviderFactory:
     def create_text_provider(provider_type: str = None, model: str | None = None) -> TextProvider:
         """Create text provider based on configuration."""
         if provider_type is None:
-            provider_type = os.environ.get("TEXT_PROVIDER", "openai").lower()
+            provider_type = _env_snapshot().text_provider
         if model is None:
-            model = os.environ.get("TEXT_MODEL")
-
-        if provider_type == "openai":
-            return OpenAITextProvider(model=model)
-        elif provider_type == "anthropic":
-            return AnthropicTextProvider(model=model)
-        elif provider_type == "local":
-            return LocalTextProvider(model=model)
-        else:
+            model = _env_snapshot().text_model
+
+        if provider_type not in _PROVIDER_MODULES:
             raise ValueError(f"Unknown text provider: {provider_type}")
+        return _get_text(provider_type, model)
     
     @staticmethod
     def create_vision_provider(provider_type: str = None, model: str | None = None) -> VisionProvider:
         """Create vision provider based on configuration."""
         if provider_type is None:
-            provider_type = os.environ.get("VISION_PROVIDER", "openai").lower()
+            provider_type = _env_snapshot().vision_provider
         if model is None:
-            model = os.environ.get("VISION_MODEL")
-
-        if provider_type == "openai":
-            return OpenAIVisionProvider(model=model)
-        elif provider_type == "anthropic":
-            return AnthropicVisionProvider(model=model)
-        elif provider_type == "local":
-            return LocalVisionProvider(model=model)
-        else:
+            model = _env_snapshot().vision_model
+
+        if provider_type not in _PROVIDER_MODULES:
             raise ValueError(f"Unknown vision provider: {provider_type}")
+        return _get_vision(provider_type, model)
     
     @staticmethod
     def create_providers(text_provider: str = None, vision_provider: str = None,
@@ -54,48 +128,28 @@ class ProviderFactory:
         return text_prov, vision_prov
     
     @staticmethod
-    def get_available_providers() -> dict:
+    def refresh_env() -> None:
+        """Re-read provider settings from the environment on next use."""
+        _env_snapshot.cache_clear()
+        _provider_config.cache_clear()
+        ProviderFactory.clear_cache()
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Drop cached provider instances so the next request builds new ones."""
+        _get_text.cache_clear()
+        _get_vision.cache_clear()
+
+    @staticmethod
+    def get_available_providers() -> types.MappingProxyType:
         """Get list of available providers."""
-        return {
-            "text": ["openai", "anthropic", "local"],
-            "vision": ["openai", "anthropic", "local"]
-        }
+        return _AVAILABLE_PROVIDERS
     
     @staticmethod
-    def validate_provider_config() -> dict:
-        """Validate provider configuration and API keys."""
-        config = {
-            "text_provider": os.environ.get("TEXT_PROVIDER", "openai"),
-            "vision_provider": os.environ.get("VISION_PROVIDER", "openai"),
-            "text_model": os.environ.get("TEXT_MODEL", ""),
-            "vision_model": os.environ.get("VISION_MODEL", ""),
-            "openai_available": bool(os.environ.get("OPENAI_API_KEY")),
-            "anthropic_available": bool(os.environ.get("ANTHROPIC_API_KEY")),
-            "local_available": True  # Always available (mock)
-        }
-        
-        # Validate current configuration
-        text_provider = config["text_provider"]
-        vision_provider = config["vision_provider"]
-        
-        if text_provider == "openai" and not config["openai_available"]:
-            config["text_provider_valid"] = False
-            config["text_provider_error"] = "OpenAI API key not configured"
-        elif text_provider == "anthropic" and not config["anthropic_available"]:
-            config["text_provider_valid"] = False
-            config["text_provider_error"] = "Anthropic API key not configured"
-        else:
-            config["text_provider_valid"] = True
-            config["text_provider_error"] = None
-        
-        if vision_provider == "openai" and not config["openai_available"]:
-            config["vision_provider_valid"] = False
-            config["vision_provider_error"] = "OpenAI API key not configured"
-        elif vision_provider == "anthropic" and not config["anthropic_available"]:
-            config["vision_provider_valid"] = False
-            config["vision_provider_error"] = "Anthropic API key not configured"
-        else:
-            config["vision_provider_valid"] = True
-            config["vision_provider_error"] = None
-        
-        return config
+    def validate_provider_config() -> types.MappingProxyType:
+        """Validate provider configuration and API keys.
+
+        The result only changes with the environment, so it is computed once
+        per :meth:`refresh_env` and shared read-only between callers.
+        """
+        return _provider_config()
@@ -2,32 +2,143 @@
 
 from __future__ import annotations
 
-from typing import Dict, List
+import functools
+import logging
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, FrozenSet, Iterable, List
 
 from lxml import etree
 
+logger = logging.getLogger(__name__)
 
-def apply_brex_rules(xml_str: str, rules: List[Dict]) -> List[str]:
+
+@functools.lru_cache(maxsize=512)
+def _compile_xpath(expr: str) -> etree.XPath:
+    """Compile ``expr`` once; rule sets are reused across every document."""
+    return etree.XPath(expr)
+
+
+_PREDICATE_RE = re.compile(r"\[[^\[\]]*\]")
+# Steps naming elements, optionally on an axis whose nodes are elements.
+_NAME_STEP_RE = re.compile(
+    r"^(?:(?:child|descendant(?:-or-self)?|self|parent|ancestor(?:-or-self)?"
+    r"|following(?:-sibling)?|preceding(?:-sibling)?)::)?([A-Za-z_][\w.-]*)$"
+)
+# Steps selecting attributes or namespaces name no elements.
+_NON_ELEMENT_STEPS = ("@", "attribute::", "namespace::")
+
+
+@functools.lru_cache(maxsize=512)
+def _required_tags(expr: str) -> FrozenSet[str]:
+    """Return element names that must occur in a document for ``expr`` to match.
+
+    Only plain location paths are analysed; predicates are ignored because
+    they may test for absence (``not(child)``). Anything else, such as unions,
+    functions or prefixed names, yields an empty set and is always evaluated.
+    """
+    if not expr.startswith("/") or "|" in expr:
+        return frozenset()
+    path = expr
+    while True:
+        stripped = _PREDICATE_RE.sub("", path)
+        if stripped == path:
+            break
+        path = stripped
+    tags = set()
+    for step in path.split("/"):
+        if not step or step in (".", "..", "*") or step.startswith(_NON_ELEMENT_STEPS):
+            continue
+        match = _NAME_STEP_RE.match(step)
+        if match is None:
+            if step.endswith("()") or step.endswith("::*"):
+                continue
+            return frozenset()
+        tags.add(match.group(1))
+    return frozenset(tags)
+
+
+# Rendered data modules carry no ID lookups or entities, so lxml can skip
+# building the ID table and expanding entities. lxml parsers must not be shared
+# between threads, so each thread keeps its own.
+_local = threading.local()
+
+
+def _parser() -> etree.XMLParser:
+    parser = getattr(_local, "parser", None)
+    if parser is None:
+        parser = _local.parser = etree.XMLParser(collect_ids=False, resolve_entities=False)
+    return parser
+
+
+# lxml evaluates XPath without holding the GIL, so large rule sets are split
+# across threads. Below the threshold the pool hand-off costs more than it saves.
+PARALLEL_RULE_THRESHOLD = 32
+_WORKERS = os.cpu_count() or 1
+_RULE_POOL = ThreadPoolExecutor(max_workers=_WORKERS, thread_name_prefix="brex")
+
+
+class BrexRuleSet:
+    """BREX rules compiled once for evaluation against many documents.
+
+    Each rule dictionary is reduced to the element names its XPath needs, the
+    compiled XPath and the violation message, so applying the set does no
+    per-rule dictionary lookups or string formatting. Rules whose XPath does
+    not compile are logged and skipped.
+    """
+
+    __slots__ = ("rules",)
+
+    def __init__(self, rules: Iterable[Dict]):
+        self.rules = []
+        for rule in rules:
+            expr = rule.get("xpath")
+            if not expr:
+                continue
+            rule_id = rule.get("id", "BREX")
+            try:
+                xpath = _compile_xpath(expr)
+            except etree.XPathSyntaxError as e:
+                # One malformed rule must not disable the rest of the set.
+                logger.error(f"Skipping BREX rule {rule_id} with invalid XPath {expr!r}: {e}")
+                continue
+            self.rules.append(
+                (
+                    _required_tags(expr),
+                    xpath,
+                    f"{rule_id}: {rule.get('message', 'Rule violation')}",
+                )
+            )
+
+
+def apply_brex_rules(xml: str | bytes, rules: BrexRuleSet | List[Dict]) -> List[str]:
     """Evaluate BREX XPath rules against XML and return violation messages.
 
-    Each rule should be a dictionary with ``id``, ``xpath`` and ``message`` keys.
+    ``xml`` may be text or already-encoded UTF-8 bytes.
+    ``rules`` is a :class:`BrexRuleSet` or a list of dictionaries with ``id``,
+    ``xpath`` and ``message`` keys; pass a rule set when applying the same
+    rules repeatedly.
     The rule's XPath expression is expected to select nodes that violate the
     constraint. If any nodes are returned, the corresponding message is added to
     the result list prefixed with the rule id.
     """
+    if not isinstance(rules, BrexRuleSet):
+        rules = BrexRuleSet(rules)
+    if isinstance(xml, str):
+        xml = xml.encode("utf-8")
     try:
-        tree = etree.fromstring(xml_str.encode())
+        tree = etree.fromstring(xml, parser=_parser())
     except Exception:
         return ["Invalid XML provided"]
 
-    violations: List[str] = []
-    for rule in rules:
-        xpath = rule.get("xpath")
-        if not xpath:
-            continue
-        nodes = tree.xpath(xpath)
-        if nodes:
-            rule_id = rule.get("id", "BREX")
-            message = rule.get("message", "Rule violation")
-            violations.append(f"{rule_id}: {message}")
-    return violations
+    # One pass over the tree lets rules whose elements are absent skip their
+    # XPath evaluation entirely.
+    present = {el.tag for el in tree.iter() if isinstance(el.tag, str)}
+    candidates = [(xpath, message) for required, xpath, message in rules.rules if required <= present]
+    if _WORKERS > 1 and len(candidates) >= PARALLEL_RULE_THRESHOLD:
+        hits = _RULE_POOL.map(lambda rule: bool(rule[0](tree)), candidates)
+    else:
+        hits = (bool(xpath(tree)) for xpath, _ in candidates)
+    return [message for (_, message), hit in zip(candidates, hits) if hit]
@@ -1,10 +1,58 @@
 """Base models for Aquila S1000D-AI system."""
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, ConfigDict, Field
 from typing import Optional, List, Dict, Any
-from datetime import datetime
+from datetime import datetime, timezone
 from enum import Enum
-import uuid
+import functools
+import os
+import threading
+
+
+# IDs are cut from a pool of random bytes refilled 4 KiB at a time, so creating
+# many models costs one os.urandom call per 256 IDs instead of one each.
+_RANDOM_POOL_SIZE = 4096
+_random_pool = b""
+_random_pos = 0
+_random_lock = threading.Lock()
+
+
+def _reset_random_pool() -> None:
+    # A forked worker must never reuse bytes its parent has already handed out.
+    global _random_pool, _random_pos
+    _random_pool, _random_pos = b"", 0
+
+
+os.register_at_fork(after_in_child=_reset_random_pool)
+
+
+def random_bytes(n: int) -> bytes:
+    """Return ``n`` cryptographically random bytes from the shared pool."""
+    global _random_pool, _random_pos
+    with _random_lock:
+        if _random_pos + n > len(_random_pool):
+            _random_pool, _random_pos = os.urandom(max(_RANDOM_POOL_SIZE, n)), 0
+        chunk = _random_pool[_random_pos:_random_pos + n]
+        _random_pos += n
+    return chunk
+
+
+# Timezone-aware replacement for the deprecated datetime.utcnow.
+utcnow = functools.partial(datetime.now, timezone.utc)
+
+
+def new_uuid() -> str:
+    """Return a random (version 4) UUID string, like ``str(uuid.uuid4())``."""
+    b = bytearray(random_bytes(16))
+    b[6] = (b[6] & 0x0F) | 0x40
+    b[8] = (b[8] & 0x3F) | 0x80
+    h = b.hex()
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def new_short_id(prefix: str) -> str:
+    """Return ``prefix`` followed by 8 random upper-case hex digits, e.g. ``ICN-1A2B3C4D``."""
+    return f"{prefix}-{random_bytes(4).hex().upper()}"
 
 
 class DMTypeEnum(str, Enum):
@@ -51,14 +99,12 @@ class StructureType(str, Enum):
 
 class BaseDocument(BaseModel):
     """Base document model."""
-    id: str = Field(default_factory=lambda: str(uuid.uuid4()))
-    created_at: datetime = Field(default_factory=datetime.utcnow)
-    updated_at: datetime = Field(default_factory=datetime.utcnow)
-    
-    class Config:
-        json_encoders = {
-            datetime: lambda v: v.isoformat()
-        }
+    id: str = Field(default_factory=new_uuid)
+    created_at: datetime = Field(default_factory=utcnow)
+    updated_at: datetime = Field(default_factory=utcnow)
+
+    # pydantic-core writes datetimes as ISO 8601 natively; no json_encoders needed.
+    model_config = ConfigDict()
 
 
 class SettingsModel(BaseDocument):
@@ -3,8 +3,7 @@
 from pydantic import BaseModel, Field
 from typing import List, Dict, Any
 from datetime import datetime
-from .base import BaseDocument, DMTypeEnum, ValidationStatus, SecurityLevel
-import uuid
+from .base import BaseDocument, DMTypeEnum, ValidationStatus, SecurityLevel, new_short_id
 
 
 class UploadedDocument(BaseDocument):
@@ -22,8 +21,8 @@ class UploadedDocument(BaseDocument):
 
 class ICN(BaseDocument):
     """Illustration Control Number model."""
-    icn_id: str = Field(default_factory=lambda: f"ICN-{uuid.uuid4().hex[:8].upper()}")
-    lcn: str = Field(default_factory=lambda: f"LCN-{uuid.uuid4().hex[:8].upper()}")
+    icn_id: str = Field(default_factory=lambda: new_short_id("ICN"))
+    lcn: str = Field(default_factory=lambda: new_short_id("LCN"))
     filename: str
     file_path: str
     sha256_hash: str
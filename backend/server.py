@@ -1,31 +1,38 @@
 """Main FastAPI server for Aquila S1000D-AI system."""
 
+import asyncio
 import base64
+import hashlib
 import io
 import json
 import logging
 import os
 import re
 import uuid
-from datetime import datetime, timedelta
+from datetime import timedelta
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple
 
+import msgspec
+import orjson
 import yaml
 from dotenv import load_dotenv
-from fastapi import APIRouter, Depends, FastAPI, File, Form, HTTPException, UploadFile
+from fastapi import APIRouter, Depends, FastAPI, File, Form, HTTPException, Query, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import FileResponse, StreamingResponse
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
 from jose import JWTError, jwt
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ASCENDING, DESCENDING, ReturnDocument, WriteConcern
+from pymongo.errors import PyMongoError
 from passlib.context import CryptContext
 
+from .ai_providers.base import exact_cache_stats
 from .ai_providers.provider_factory import ProviderFactory
-from .brex_rules import apply_brex_rules
+from .brex_rules import BrexRuleSet, apply_brex_rules
 
 # Import models
-from .models.base import ProviderEnum, SecurityLevel, SettingsModel, ValidationStatus
+from .models.base import ProviderEnum, SecurityLevel, SettingsModel, ValidationStatus, utcnow
 from .models.document import (
     ICN,
     DataModule,
@@ -55,10 +62,21 @@ ROOT_DIR = Path(__file__).parent
 ENV_PATH = ROOT_DIR / ".env"
 load_dotenv(ENV_PATH, override=True, verbose=True)
 
-# MongoDB connection
+# MongoDB connection, opened by each worker in ``startup_db_client`` so its
+# pool belongs to that worker's process and event loop
 mongo_url = os.environ["MONGO_URL"]
-client = AsyncIOMotorClient(mongo_url)
-db = client[os.environ["DB_NAME"]]
+client: AsyncIOMotorClient | None = None
+db = None
+
+# Status fields are recomputed on the next validation or processing run, so
+# their updates skip waiting for the primary's acknowledgement. A lost write
+# only leaves a stale status; anything that must survive keeps w=1.
+_UNACKNOWLEDGED = WriteConcern(w=0)
+
+
+def _unacknowledged(collection):
+    """Return ``collection`` configured for fire-and-forget writes."""
+    return collection.with_options(write_concern=_UNACKNOWLEDGED)
 
 # Auth configuration
 SECRET_KEY = os.environ.get("SECRET_KEY")
@@ -77,7 +95,32 @@ app = FastAPI(
     title="Aquila S1000D-AI API",
     description="AI-powered technical documentation processing system",
     version="1.0.0",
+    default_response_class=ORJSONResponse,
+)
+
+
+# Configure logging
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
 )
+logger = logging.getLogger(__name__)
+
+
+# Registered before CORSMiddleware so it runs inside it: Starlette's own
+# handler for ``Exception`` sits outside every middleware, and its 500
+# responses would reach browsers without CORS headers.
+@app.middleware("http")
+async def unhandled_exception_middleware(request: Request, call_next):
+    """Log an unexpected handler failure and report it as a 500.
+
+    Handlers raise ``HTTPException`` for expected errors such as a missing
+    document; those keep their own status codes.
+    """
+    try:
+        return await call_next(request)
+    except Exception as exc:
+        logger.exception(f"Error handling {request.method} {request.url.path}")
+        return ORJSONResponse(status_code=500, content={"detail": str(exc)})
 
 
 # Configure CORS
@@ -89,11 +132,16 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-)
-logger = logging.getLogger(__name__)
+
+# Upper bound on concurrent vision requests per processed document
+MAX_CONCURRENT_IMAGES = 64
+
+# How long AI results for a given file and provider setup are reused
+AI_CACHE_TTL_SECONDS = int(os.environ.get("AI_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+# Page sizes for the collection listing endpoints
+DEFAULT_PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 5000
 
 # Load default BREX rules
 DEFAULT_BREX_RULES_PATH = ROOT_DIR / "default_brex_rules.yaml"
@@ -106,17 +154,39 @@ else:
 # Load S1000D BREX rule set for XML validation
 S1000D_BREX_PATH = ROOT_DIR / "s1000d_brex_rules.json"
 ALL_BREX_RULES: List[Dict[str, Any]] = []
-S1000D_BREX_RULES: List[Dict[str, Any]] = []
 if S1000D_BREX_PATH.exists():
     with open(S1000D_BREX_PATH, "r") as f:
         ALL_BREX_RULES = json.load(f)
-    S1000D_BREX_RULES = ALL_BREX_RULES.copy()
+# The active rules, compiled once and reused for every validation.
+S1000D_BREX_RULES = BrexRuleSet(ALL_BREX_RULES)
 
-# Initialize document service (settings loaded later)
-document_service = DocumentService(db=db)
+# Initialize document service (database and settings attached at startup)
+document_service = DocumentService()
 
 # Cached settings loaded from the database
 system_settings: SettingsModel | None = None
+# ``system_settings`` as served by GET /settings; rebuilt whenever it changes
+_settings_cache: Dict[str, Any] | None = None
+
+
+def _cache_settings() -> None:
+    """Refresh the serialised settings after ``system_settings`` changes."""
+    global _settings_cache
+    _settings_cache = system_settings.model_dump(mode="json", exclude_none=True)
+
+
+@app.on_event("startup")
+async def startup_db_client():
+    """Connect to MongoDB from inside the worker's event loop."""
+    global client, db
+    client = AsyncIOMotorClient(
+        mongo_url,
+        maxPoolSize=int(os.environ.get("MONGO_MAX_POOL_SIZE", "200")),
+        minPoolSize=int(os.environ.get("MONGO_MIN_POOL_SIZE", "20")),
+        waitQueueTimeoutMS=int(os.environ.get("MONGO_WAIT_QUEUE_TIMEOUT_MS", "5000")),
+    )
+    db = client[os.environ["DB_NAME"]]
+    document_service.db = db
 
 
 @app.on_event("startup")
@@ -126,14 +196,39 @@ async def init_settings():
     doc = await db.settings.find_one({})
     if not doc:
         system_settings = SettingsModel(brex_rules=DEFAULT_BREX_RULES)
-        await db.settings.insert_one(system_settings.dict())
+        await db.settings.insert_one(system_settings.model_dump())
     else:
         system_settings = SettingsModel(**doc)
     document_service.settings = system_settings
+    _cache_settings()
 
     # Allow overriding the XML BREX rules from settings
     if isinstance(system_settings.brex_rules, list):
-        S1000D_BREX_RULES = system_settings.brex_rules
+        S1000D_BREX_RULES = BrexRuleSet(system_settings.brex_rules)
+
+
+
+@app.on_event("startup")
+async def ensure_indexes():
+    """Index the keys the handlers look documents up by."""
+    # Only identifiers the server generates itself are unique. DMCs repeat
+    # across documents of the same type and PM codes are chosen by users.
+    indexes = [
+        (db.documents, "id", {"unique": True}),
+        (db.documents, [("processing_status", ASCENDING), ("updated_at", DESCENDING)], {}),
+        (db.data_modules, "dmc", {}),
+        (db.icns, "icn_id", {"unique": True}),
+        (db.icns, "lcn", {}),
+        (db.publication_modules, "pm_code", {}),
+        (db.users, "username", {}),
+        (db.ai_cache, "sha", {}),
+        (db.ai_cache, "created_at", {"expireAfterSeconds": AI_CACHE_TTL_SECONDS}),
+    ]
+    for collection, keys, options in indexes:
+        try:
+            await collection.create_index(keys, **options)
+        except PyMongoError as e:
+            logger.warning(f"Could not create index {keys} on {collection.name}: {e}")
 
 
 async def get_current_user(token: str = Depends(oauth2_scheme)) -> User:
@@ -185,7 +280,7 @@ async def register_user(username: str = Form(...), password: str = Form(...)):
         raise HTTPException(400, "Username already exists")
     hashed = get_password_hash(password)
     user = User(username=username, hashed_password=hashed, roles=["user"])
-    await db.users.insert_one(user.dict())
+    await db.users.insert_one(user.model_dump())
     return {"message": "User registered"}
 
 
@@ -355,8 +450,9 @@ async def health_check():
     provider_config = ProviderFactory.validate_provider_config()
     return {
         "status": "healthy",
-        "timestamp": datetime.utcnow().isoformat(),
+        "timestamp": utcnow().isoformat(),
         "providers": provider_config,
+        "ai_cache": exact_cache_stats(),
     }
 
 
@@ -364,10 +460,12 @@ async def health_check():
 @api_router.get("/settings")
 async def get_settings():
     """Get current system settings."""
+    if _settings_cache is not None:
+        return _settings_cache
     doc = await db.settings.find_one({})
     if not doc:
         raise HTTPException(500, "Settings not initialized")
-    return SettingsModel(**doc).dict()
+    return SettingsModel(**doc).model_dump(mode="json", exclude_none=True)
 
 
 @api_router.get("/brex-default")
@@ -388,10 +486,11 @@ async def set_xml_brex_rules(payload: Dict[str, Any]):
     global S1000D_BREX_RULES
     ids = payload.get("enabled_ids") or []
     if not ids:
-        S1000D_BREX_RULES = ALL_BREX_RULES.copy()
+        active = ALL_BREX_RULES
     else:
-        S1000D_BREX_RULES = [r for r in ALL_BREX_RULES if r.get("id") in ids]
-    return {"count": len(S1000D_BREX_RULES)}
+        active = [r for r in ALL_BREX_RULES if r.get("id") in ids]
+    S1000D_BREX_RULES = BrexRuleSet(active)
+    return {"count": len(active)}
 
 
 @api_router.post("/settings")
@@ -401,17 +500,17 @@ async def update_settings(settings: Dict[str, Any]):
 
     current_doc = await db.settings.find_one({})
     if current_doc:
-        current = SettingsModel(**current_doc).dict()
+        current = SettingsModel(**current_doc).model_dump()
     else:
-        current = SettingsModel(brex_rules=DEFAULT_BREX_RULES).dict()
+        current = SettingsModel(brex_rules=DEFAULT_BREX_RULES).model_dump()
     current.update(settings)
     system_settings = SettingsModel(**current)
     if current_doc:
         await db.settings.update_one(
-            {"id": current_doc["id"]}, {"$set": system_settings.dict()}
+            {"id": current_doc["id"]}, {"$set": system_settings.model_dump()}
         )
     else:
-        await db.settings.insert_one(system_settings.dict())
+        await db.settings.insert_one(system_settings.model_dump())
 
     # Update environment variables if provider values changed
     if "text_provider" in settings:
@@ -422,13 +521,15 @@ async def update_settings(settings: Dict[str, Any]):
         os.environ["TEXT_MODEL"] = system_settings.text_model
     if "vision_model" in settings:
         os.environ["VISION_MODEL"] = system_settings.vision_model
+    ProviderFactory.refresh_env()
 
     # Update document service settings
     document_service.settings = system_settings
+    _cache_settings()
 
     return {
         "message": "Settings updated successfully",
-        "settings": system_settings.dict(),
+        "settings": _settings_cache,
     }
 
 
@@ -436,15 +537,16 @@ async def update_settings(settings: Dict[str, Any]):
 @api_router.get("/providers")
 async def get_providers():
     """Get available AI providers and their status."""
+    config = ProviderFactory.validate_provider_config()
     return {
         "available": ProviderFactory.get_available_providers(),
         "current": {
-            "text": os.environ.get("TEXT_PROVIDER", "openai"),
-            "vision": os.environ.get("VISION_PROVIDER", "openai"),
-            "text_model": os.environ.get("TEXT_MODEL", ""),
-            "vision_model": os.environ.get("VISION_MODEL", ""),
+            "text": config["text_provider"],
+            "vision": config["vision_provider"],
+            "text_model": config["text_model"],
+            "vision_model": config["vision_model"],
         },
-        "config": ProviderFactory.validate_provider_config(),
+        "config": config,
     }
 
 
@@ -457,40 +559,58 @@ async def set_providers(
     _: User = Depends(require_admin),
 ):
     """Set AI providers."""
-    try:
-        # Validate providers
-        available = ProviderFactory.get_available_providers()
-        if text_provider not in available["text"]:
-            raise HTTPException(400, f"Invalid text provider: {text_provider}")
-        if vision_provider not in available["vision"]:
-            raise HTTPException(400, f"Invalid vision provider: {vision_provider}")
-
-        # Update environment
-        os.environ["TEXT_PROVIDER"] = text_provider
-        os.environ["VISION_PROVIDER"] = vision_provider
-        if text_model is not None:
-            os.environ["TEXT_MODEL"] = text_model
-            system_settings.text_model = text_model
-        if vision_model is not None:
-            os.environ["VISION_MODEL"] = vision_model
-            system_settings.vision_model = vision_model
-
-        # Update system settings
-        system_settings.text_provider = ProviderEnum(text_provider)
-        system_settings.vision_provider = ProviderEnum(vision_provider)
-        await db.settings.update_one(
-            {"id": system_settings.id}, {"$set": system_settings.dict()}
-        )
+    # Validate providers
+    available = ProviderFactory.get_available_providers()
+    if text_provider not in available["text"]:
+        raise HTTPException(400, f"Invalid text provider: {text_provider}")
+    if vision_provider not in available["vision"]:
+        raise HTTPException(400, f"Invalid vision provider: {vision_provider}")
+
+    # Update environment
+    os.environ["TEXT_PROVIDER"] = text_provider
+    os.environ["VISION_PROVIDER"] = vision_provider
+    if text_model is not None:
+        os.environ["TEXT_MODEL"] = text_model
+        system_settings.text_model = text_model
+    if vision_model is not None:
+        os.environ["VISION_MODEL"] = vision_model
+        system_settings.vision_model = vision_model
+    ProviderFactory.refresh_env()
+
+    # Update system settings
+    system_settings.text_provider = ProviderEnum(text_provider)
+    system_settings.vision_provider = ProviderEnum(vision_provider)
+    _cache_settings()
+    await db.settings.update_one(
+        {"id": system_settings.id}, {"$set": system_settings.model_dump()}
+    )
+
+    return {
+        "message": "Providers updated successfully",
+        "text_provider": text_provider,
+        "vision_provider": vision_provider,
+        "text_model": os.environ.get("TEXT_MODEL", ""),
+        "vision_model": os.environ.get("VISION_MODEL", ""),
+    }
 
-        return {
-            "message": "Providers updated successfully",
-            "text_provider": text_provider,
-            "vision_provider": vision_provider,
-            "text_model": os.environ.get("TEXT_MODEL", ""),
-            "vision_model": os.environ.get("VISION_MODEL", ""),
-        }
-    except Exception as e:
-        raise HTTPException(500, f"Error updating providers: {str(e)}")
+
+async def _stream_json_array(cursor):
+    """Yield the documents from ``cursor`` as the chunks of one JSON array."""
+    separator = b"["
+    async for doc in cursor:
+        yield separator + orjson.dumps(doc, option=orjson.OPT_NAIVE_UTC)
+        separator = b","
+    yield b"[]" if separator == b"[" else b"]"
+
+
+def _list_collection(collection, skip: int, limit: int) -> StreamingResponse:
+    """Stream one page of ``collection`` straight from the cursor.
+
+    Stored documents are already in API shape, so they are encoded as read
+    instead of being validated into models and held in memory.
+    """
+    cursor = collection.find({}, {"_id": 0}).skip(skip).limit(limit).batch_size(500)
+    return StreamingResponse(_stream_json_array(cursor), media_type="application/json")
 
 
 # Document upload endpoints
@@ -500,383 +620,416 @@ async def upload_document(
     security_level: SecurityLevel = Form(SecurityLevel.UNCLASSIFIED),
 ):
     """Upload a document for processing."""
-    try:
-        # Read file data
-        file_data = await file.read()
-
-        # Upload document
-        document = await document_service.upload_document(
-            file_data=file_data,
-            filename=file.filename,
-            mime_type=file.content_type,
-            security_level=security_level,
-        )
+    # Upload document, streaming it to disk
+    document = await document_service.upload_document_stream(
+        file,
+        filename=file.filename,
+        mime_type=file.content_type,
+        security_level=security_level,
+    )
 
-        # Store in database
-        await db.documents.insert_one(document.dict())
+    # Store in database
+    await db.documents.insert_one(document.model_dump())
 
-        return {
-            "message": "Document uploaded successfully",
-            "document_id": document.id,
-            "filename": document.filename,
-            "size": document.file_size,
-        }
-    except Exception as e:
-        logger.error(f"Error uploading document: {str(e)}")
-        raise HTTPException(500, f"Error uploading document: {str(e)}")
+    return {
+        "message": "Document uploaded successfully",
+        "document_id": document.id,
+        "filename": document.filename,
+        "size": document.file_size,
+    }
 
 
 @api_router.get("/documents")
-async def get_documents():
-    """Get all uploaded documents."""
-    try:
-        documents = await db.documents.find().to_list(1000)
-        return [UploadedDocument(**doc) for doc in documents]
-    except Exception as e:
-        logger.error(f"Error fetching documents: {str(e)}")
-        raise HTTPException(500, f"Error fetching documents: {str(e)}")
+async def get_documents(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Get uploaded documents, ``limit`` at a time starting at ``skip``."""
+    return _list_collection(db.documents, skip, limit)
 
 
 @api_router.get("/documents/{document_id}")
 async def get_document(document_id: str):
     """Get a specific document."""
-    try:
-        document = await db.documents.find_one({"id": document_id})
-        if not document:
-            raise HTTPException(404, "Document not found")
-        return UploadedDocument(**document)
-    except Exception as e:
-        logger.error(f"Error fetching document: {str(e)}")
-        raise HTTPException(500, f"Error fetching document: {str(e)}")
+    document = await db.documents.find_one({"id": document_id})
+    if not document:
+        raise HTTPException(404, "Document not found")
+    return UploadedDocument(**document)
+
+
+async def _ai_cache_key(document: UploadedDocument) -> Dict[str, Any]:
+    """Identify the AI results for ``document``'s bytes under the current configuration.
+
+    Besides the providers, the results depend on the DMC settings and on the
+    other uploaded documents, whose text is appended to the AI prompts.
+    """
+    config = ProviderFactory.validate_provider_config()
+    settings = await document_service.load_settings()
+    dmc_settings = orjson.dumps(
+        {
+            "dmc_defaults": getattr(settings, "dmc_defaults", {}),
+            "structure_type": getattr(settings, "structure_type", None),
+        },
+        option=orjson.OPT_SORT_KEYS,
+    )
+    # Same documents, in the same order, as DocumentService.gather_all_documents_text
+    others = await db.documents.find({}, {"_id": 0, "id": 1, "sha256_hash": 1}).to_list(1000)
+    corpus = "\n".join(d.get("sha256_hash", "") for d in others if d.get("id") != document.id)
+    return {
+        "sha": document.sha256_hash,
+        "security_level": document.security_level.value,
+        "text_provider": config["text_provider"],
+        "vision_provider": config["vision_provider"],
+        "text_model": config["text_model"],
+        "vision_model": config["vision_model"],
+        "settings": hashlib.sha256(dmc_settings).hexdigest(),
+        "corpus": hashlib.sha256(corpus.encode()).hexdigest(),
+    }
+
+
+def _from_ai_cache(model, data: Dict[str, Any], fresh: Tuple[str, ...] = (), **overrides):
+    """Rebuild a cached record as a new ``model`` with new IDs and timestamps."""
+    skip = {"_id", "id", "created_at", "updated_at", *fresh}
+    fields = {k: v for k, v in data.items() if k not in skip}
+    fields.update(overrides)
+    return model(**fields)
 
 
 @api_router.post("/documents/{document_id}/process")
 async def process_document(document_id: str, current_user: User = Depends(get_current_active_user)):
     """Process a document to create data modules."""
-    try:
-        # Get document
-        doc_data = await db.documents.find_one({"id": document_id})
-        if not doc_data:
-            raise HTTPException(404, "Document not found")
-
-        document = UploadedDocument(**doc_data)
+    # Get document
+    doc_data = await db.documents.find_one({"id": document_id})
+    if not doc_data:
+        raise HTTPException(404, "Document not found")
+
+    document = UploadedDocument(**doc_data)
+    # One timestamp for everything this run creates, so its records correlate
+    now = utcnow()
+
+    # Reuse the AI results of an identical file processed with the same configuration
+    cache_key = await _ai_cache_key(document)
+    cached = await db.ai_cache.find_one(cache_key)
+    cacheable = False
+    data_modules = None
+    if cached:
+        try:
+            processed_images = await document_service.adopt_icns(
+                document, [_from_ai_cache(ICN, icn, ("icn_id",)) for icn in cached["icns"]]
+            )
+        except OSError as e:
+            logger.warning(f"Cached images for document {document_id} are unavailable: {e}")
+        else:
+            data_modules = [
+                _from_ai_cache(DataModule, dm, ("audit_log",), source_document_id=document.id)
+                for dm in cached["data_modules"]
+            ]
+    if data_modules is None:
+        # Extract text content and images concurrently
+        text_content, images = await asyncio.gather(
+            document_service.extract_text_from_document(document),
+            document_service.extract_images_from_document(document),
+        )
 
-        # Extract text content
-        text_content = await document_service.extract_text_from_document(document)
+        # Process images with AI concurrently, within the provider's limits
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_IMAGES)
 
-        # Extract images
-        images = await document_service.extract_images_from_document(document)
+        async def _process_image(image):
+            async with semaphore:
+                return await document_service.describe_image(image)
 
-        # Process images with AI
+        results = await asyncio.gather(*map(_process_image, images), return_exceptions=True)
         processed_images = []
-        for image in images:
-            processed_image = await document_service.process_image_with_ai(image)
-            processed_images.append(processed_image)
-            # Store ICN in database
-            await db.icns.insert_one(processed_image.dict())
+        # Only complete results are worth reusing
+        cacheable = True
+        for result in results:
+            if isinstance(result, BaseException):
+                logger.error(f"Error processing image for document {document_id}: {result}")
+                cacheable = False
+            else:
+                icn, succeeded = result
+                processed_images.append(icn)
+                cacheable = cacheable and succeeded
 
         # Process document with AI
         data_modules = await document_service.process_document_with_ai(
             document, text_content
         )
+        cacheable = cacheable and all(dm.processing_status != "error" for dm in data_modules)
+
+    for record in (*processed_images, *data_modules):
+        record.created_at = record.updated_at = now
+
+    # Store ICNs in database in one round trip
+    # Each record is dumped once; the dumps are shared with the AI cache, and
+    # the module dumps also with the response.
+    icn_docs = [icn.model_dump() for icn in processed_images]
+    if icn_docs:
+        await db.icns.insert_many(icn_docs, ordered=False)
+
+    # Store data modules in database in one round trip
+    entries = []
+    for dm in data_modules:
+        entry = {"action": "create", "dmc": dm.dmc, "source_file": document.filename, "user": current_user.username, "author": "ai"}
+        dm.audit_log.append(entry)
+        entries.append(entry)
+    module_docs = [dm.model_dump() for dm in data_modules]
+    if module_docs:
+        # insert_many adds "_id" to the documents it is given; copies keep the
+        # dumps serialisable for the response.
+        await db.data_modules.insert_many([dict(doc) for doc in module_docs], ordered=False)
+    for entry in entries:
+        await document_service.audit_service.log(entry)
 
-        # Store data modules in database
-        stored_modules = []
-        for dm in data_modules:
-            entry = {"action": "create", "dmc": dm.dmc, "source_file": document.filename, "user": current_user.username, "author": "ai"}
-            dm.audit_log.append(entry)
-            await db.data_modules.insert_one(dm.dict())
-            stored_modules.append(dm)
-            await document_service.audit_service.log(entry)
-
-        await document_service.refresh_cross_references()
-
-        # Update document status
-        await db.documents.update_one(
-            {"id": document_id},
-            {
-                "$set": {
-                    "processing_status": "completed",
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-        )
+    if cacheable:
+        try:
+            await db.ai_cache.insert_one(
+                {**cache_key, "icns": icn_docs, "data_modules": module_docs, "created_at": now}
+            )
+        except Exception as e:
+            logger.warning(f"Could not cache AI results for document {document_id}: {e}")
+
+    await document_service.refresh_cross_references()
+
+    # Update document status
+    await _unacknowledged(db.documents).update_one(
+        {"id": document_id},
+        {
+            "$set": {
+                "processing_status": "completed",
+                "updated_at": now,
+            }
+        },
+    )
 
-        return {
-            "message": "Document processed successfully",
-            "document_id": document_id,
-            "data_modules": len(stored_modules),
-            "images": len(processed_images),
-            "modules": [dm.dict() for dm in stored_modules],
-        }
-    except Exception as e:
-        logger.error(f"Error processing document: {str(e)}")
-        raise HTTPException(500, f"Error processing document: {str(e)}")
+    return {
+        "message": "Document processed successfully",
+        "document_id": document_id,
+        "data_modules": len(module_docs),
+        "images": len(processed_images),
+        "modules": module_docs,
+    }
 
 
 # Data Module endpoints
 @api_router.get("/data-modules")
-async def get_data_modules():
-    """Get all data modules."""
-    try:
-        modules = await db.data_modules.find().to_list(1000)
-        return [DataModule(**module) for module in modules]
-    except Exception as e:
-        logger.error(f"Error fetching data modules: {str(e)}")
-        raise HTTPException(500, f"Error fetching data modules: {str(e)}")
+async def get_data_modules(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Get data modules, ``limit`` at a time starting at ``skip``."""
+    return _list_collection(db.data_modules, skip, limit)
 
 
 @api_router.get("/data-modules/{dmc}")
 async def get_data_module(dmc: str):
     """Get a specific data module."""
-    try:
-        module = await db.data_modules.find_one({"dmc": dmc})
-        if not module:
-            raise HTTPException(404, "Data module not found")
-        return DataModule(**module)
-    except Exception as e:
-        logger.error(f"Error fetching data module: {str(e)}")
-        raise HTTPException(500, f"Error fetching data module: {str(e)}")
+    module = await db.data_modules.find_one({"dmc": dmc})
+    if not module:
+        raise HTTPException(404, "Data module not found")
+    return DataModule(**module)
 
 
 @api_router.get("/data-modules/{dmc}/export")
 async def export_data_module(dmc: str, format: str = "xml"):
     """Export a data module."""
-    try:
-        module_data = await db.data_modules.find_one({"dmc": dmc})
-        if not module_data:
-            raise HTTPException(404, "Data module not found")
-        module = DataModule(**module_data)
-        if format == "xml":
-            xml_str = document_service.render_data_module_xml(module)
-            return StreamingResponse(
-                io.BytesIO(xml_str.encode("utf-8")), media_type="application/xml"
-            )
-        else:
-            raise HTTPException(400, "Unsupported format")
-    except Exception as e:
-        logger.error(f"Error exporting data module: {str(e)}")
-        raise HTTPException(500, f"Error exporting data module: {str(e)}")
+    module_data = await db.data_modules.find_one({"dmc": dmc})
+    if not module_data:
+        raise HTTPException(404, "Data module not found")
+    module = DataModule(**module_data)
+    if format == "xml":
+        xml_str = document_service.render_data_module_xml(module)
+        return StreamingResponse(
+            io.BytesIO(xml_str.encode("utf-8")), media_type="application/xml"
+        )
+    else:
+        raise HTTPException(400, "Unsupported format")
 
 
 @api_router.put("/data-modules/{dmc}")
 async def update_data_module(dmc: str, module_data: Dict[str, Any], current_user: User = Depends(get_current_active_user)):
     """Update a data module."""
-    try:
-        # Update module in database
-        result = await db.data_modules.update_one(
-            {"dmc": dmc}, {"$set": {**module_data, "updated_at": datetime.utcnow()}}
-        )
+    # Update module and record the change in one round trip; the audit log
+    # itself can only be appended to.
+    changes = {k: v for k, v in module_data.items() if k != "audit_log"}
+    entry = {"action": "update", "dmc": dmc, "user": current_user.username, "changes": module_data}
+    module = await db.data_modules.find_one_and_update(
+        {"dmc": dmc},
+        {"$set": {**changes, "updated_at": utcnow()}, "$push": {"audit_log": entry}},
+        projection={"_id": 0},
+        return_document=ReturnDocument.AFTER,
+    )
 
-        if result.matched_count == 0:
-            raise HTTPException(404, "Data module not found")
-        entry = {"action": "update", "dmc": dmc, "user": current_user.username, "changes": module_data}
-        await db.data_modules.update_one({"dmc": dmc}, {"$push": {"audit_log": entry}})
-        await document_service.audit_service.log(entry)
+    if module is None:
+        raise HTTPException(404, "Data module not found")
+    await document_service.audit_service.log(entry)
 
-        return {"message": "Data module updated successfully"}
-    except Exception as e:
-        logger.error(f"Error updating data module: {str(e)}")
-        raise HTTPException(500, f"Error updating data module: {str(e)}")
+    return {"message": "Data module updated successfully", "module": module}
 
 
 @api_router.delete("/data-modules/{dmc}")
 async def delete_data_module(dmc: str):
     """Delete a data module."""
-    try:
-        result = await db.data_modules.delete_one({"dmc": dmc})
-        if result.deleted_count == 0:
-            raise HTTPException(404, "Data module not found")
-        return {"message": "Data module deleted successfully"}
-    except Exception as e:
-        logger.error(f"Error deleting data module: {str(e)}")
-        raise HTTPException(500, f"Error deleting data module: {str(e)}")
+    result = await db.data_modules.delete_one({"dmc": dmc})
+    if result.deleted_count == 0:
+        raise HTTPException(404, "Data module not found")
+    return {"message": "Data module deleted successfully"}
 
 
 # ICN endpoints
 @api_router.get("/icns")
-async def get_icns():
-    """Get all ICNs."""
-    try:
-        icns = await db.icns.find().to_list(1000)
-        return [ICN(**icn) for icn in icns]
-    except Exception as e:
-        logger.error(f"Error fetching ICNs: {str(e)}")
-        raise HTTPException(500, f"Error fetching ICNs: {str(e)}")
+async def get_icns(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Get ICNs, ``limit`` at a time starting at ``skip``."""
+    return _list_collection(db.icns, skip, limit)
 
 
 @api_router.get("/icns/{icn_id}")
 async def get_icn(icn_id: str):
     """Get a specific ICN."""
-    try:
-        icn = await db.icns.find_one({"icn_id": icn_id})
-        if not icn:
-            raise HTTPException(404, "ICN not found")
-        return ICN(**icn)
-    except Exception as e:
-        logger.error(f"Error fetching ICN: {str(e)}")
-        raise HTTPException(500, f"Error fetching ICN: {str(e)}")
+    icn = await db.icns.find_one({"icn_id": icn_id})
+    if not icn:
+        raise HTTPException(404, "ICN not found")
+    return ICN(**icn)
 
 
 @api_router.get("/icns/{icn_id}/image")
 async def get_icn_image(icn_id: str):
     """Get ICN image file."""
-    try:
-        icn = await db.icns.find_one({"icn_id": icn_id})
-        if not icn:
-            raise HTTPException(404, "ICN not found")
+    icn = await db.icns.find_one({"icn_id": icn_id})
+    if not icn:
+        raise HTTPException(404, "ICN not found")
 
-        icn_obj = ICN(**icn)
-        return FileResponse(
-            icn_obj.file_path, media_type=icn_obj.mime_type, filename=icn_obj.filename
-        )
-    except Exception as e:
-        logger.error(f"Error fetching ICN image: {str(e)}")
-        raise HTTPException(500, f"Error fetching ICN image: {str(e)}")
+    icn_obj = ICN(**icn)
+    return FileResponse(
+        icn_obj.file_path, media_type=icn_obj.mime_type, filename=icn_obj.filename
+    )
 
 
 @api_router.put("/icns/{icn_id}")
 async def update_icn(icn_id: str, icn_data: Dict[str, Any]):
     """Update an ICN and propagate changes to referencing data modules."""
-    try:
-        icn = await db.icns.find_one({"icn_id": icn_id})
-        if not icn:
-            raise HTTPException(404, "ICN not found")
+    # The previous LCN is needed to touch the modules referencing it, so
+    # fetch the document as it was and apply the change locally.
+    now = utcnow()
+    changes = {**icn_data, "updated_at": now}
+    icn = await db.icns.find_one_and_update(
+        {"icn_id": icn_id},
+        {"$set": changes},
+        projection={"_id": 0},
+        return_document=ReturnDocument.BEFORE,
+    )
+    if icn is None:
+        raise HTTPException(404, "ICN not found")
 
-        lcn = icn.get("lcn")
+    lcn = icn.get("lcn")
 
-        result = await db.icns.update_one(
-            {"icn_id": icn_id}, {"$set": {**icn_data, "updated_at": datetime.utcnow()}}
+    if lcn:
+        await db.data_modules.update_many(
+            {"icn_refs": lcn}, {"$set": {"updated_at": now}}
         )
 
-        if result.matched_count == 0:
-            raise HTTPException(404, "ICN not found")
-
-        if lcn:
-            await db.data_modules.update_many(
-                {"icn_refs": lcn}, {"$set": {"updated_at": datetime.utcnow()}}
-            )
-
-        await document_service.refresh_cross_references()
+    await document_service.refresh_cross_references()
 
-        return {"message": "ICN updated successfully"}
-    except Exception as e:
-        logger.error(f"Error updating ICN: {str(e)}")
-        raise HTTPException(500, f"Error updating ICN: {str(e)}")
+    return {"message": "ICN updated successfully", "icn": {**icn, **changes}}
 
 
 # Validation endpoints
 @api_router.post("/validate/{dmc}")
 async def validate_data_module(dmc: str):
     """Validate a data module using BREX rules."""
-    try:
-        module = await db.data_modules.find_one({"dmc": dmc})
-        if not module:
-            raise HTTPException(404, "Data module not found")
+    module = await db.data_modules.find_one({"dmc": dmc})
+    if not module:
+        raise HTTPException(404, "Data module not found")
 
-        settings_doc = await db.settings.find_one({})
-        if settings_doc and "brex_rules" in settings_doc:
-            rules = SettingsModel(**settings_doc).brex_rules
-        else:
-            rules = DEFAULT_BREX_RULES
-        (
-            validation_status,
-            validation_errors,
-            brex_valid,
-            xml_valid,
-        ) = await async_validate_module_dict(module, rules)
-
-        # Update module validation status
-        await db.data_modules.update_one(
-            {"dmc": dmc},
-            {
-                "$set": {
-                    "validation_status": validation_status.value,
-                    "validation_errors": validation_errors,
-                    "xsd_valid": xml_valid,
-                    "brex_valid": brex_valid,
-                    "updated_at": datetime.utcnow(),
-                }
-            },
-        )
+    settings_doc = await db.settings.find_one({})
+    if settings_doc and "brex_rules" in settings_doc:
+        rules = SettingsModel(**settings_doc).brex_rules
+    else:
+        rules = DEFAULT_BREX_RULES
+    (
+        validation_status,
+        validation_errors,
+        brex_valid,
+        xml_valid,
+    ) = await async_validate_module_dict(module, rules)
+
+    # Update module validation status
+    await _unacknowledged(db.data_modules).update_one(
+        {"dmc": dmc},
+        {
+            "$set": {
+                "validation_status": validation_status.value,
+                "validation_errors": validation_errors,
+                "xsd_valid": xml_valid,
+                "brex_valid": brex_valid,
+                "updated_at": utcnow(),
+            }
+        },
+    )
 
-        return {
-            "dmc": dmc,
-            "status": validation_status.value,
-            "errors": validation_errors,
-            "xsd_valid": xml_valid,
-            "brex_valid": brex_valid,
-        }
-    except Exception as e:
-        logger.error(f"Error validating data module: {str(e)}")
-        raise HTTPException(500, f"Error validating data module: {str(e)}")
+    return {
+        "dmc": dmc,
+        "status": validation_status.value,
+        "errors": validation_errors,
+        "xsd_valid": xml_valid,
+        "brex_valid": brex_valid,
+    }
 
 
 @api_router.post("/fix-module/{dmc}")
 async def fix_data_module(dmc: str, method: str = "ai"):
     """Attempt correction of a data module."""
-    try:
-        module = await db.data_modules.find_one({"dmc": dmc})
-        if not module:
-            raise HTTPException(404, "Data module not found")
-
-        dm = DataModule(**module)
-        if method == "ai":
-            review = await document_service.review_module_ai(dm.content)
-            suggested = review.get("suggested_text")
-            issues = review.get("issues", [])
-            if suggested:
-                dm.content = suggested
-            dm.ai_suggestions = review
-            dm.processing_logs.append({"fix": "ai", "issues": issues, "timestamp": datetime.utcnow()})
-        elif method == "manual":
-            dm.processing_logs.append({"fix": "manual", "timestamp": datetime.utcnow()})
-        await db.data_modules.update_one({"dmc": dmc}, {"$set": dm.dict()})
-        await document_service.refresh_cross_references()
-        return {"message": "Data module updated", "dmc": dmc}
-    except Exception as e:
-        logger.error(f"Error fixing data module: {str(e)}")
-        raise HTTPException(500, f"Error fixing data module: {str(e)}")
+    module = await db.data_modules.find_one({"dmc": dmc})
+    if not module:
+        raise HTTPException(404, "Data module not found")
+
+    dm = DataModule(**module)
+    if method == "ai":
+        review = await document_service.review_module_ai(dm.content)
+        suggested = review.get("suggested_text")
+        issues = review.get("issues", [])
+        if suggested:
+            dm.content = suggested
+        dm.ai_suggestions = review
+        dm.processing_logs.append({"fix": "ai", "issues": issues, "timestamp": utcnow()})
+    elif method == "manual":
+        dm.processing_logs.append({"fix": "manual", "timestamp": utcnow()})
+    await db.data_modules.update_one({"dmc": dmc}, {"$set": dm.model_dump()})
+    await document_service.refresh_cross_references()
+    return {"message": "Data module updated", "dmc": dmc}
 
 
 # Publication Module endpoints
 @api_router.get("/publication-modules")
-async def get_publication_modules():
-    """Get all publication modules."""
-    try:
-        pms = await db.publication_modules.find().to_list(1000)
-        return [PublicationModule(**pm) for pm in pms]
-    except Exception as e:
-        logger.error(f"Error fetching publication modules: {str(e)}")
-        raise HTTPException(500, f"Error fetching publication modules: {str(e)}")
+async def get_publication_modules(
+    skip: int = Query(0, ge=0),
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+):
+    """Get publication modules, ``limit`` at a time starting at ``skip``."""
+    return _list_collection(db.publication_modules, skip, limit)
 
 
 @api_router.post("/publication-modules")
 async def create_publication_module(pm_data: Dict[str, Any]):
     """Create a new publication module."""
-    try:
-        pm = PublicationModule(**pm_data)
-        await db.publication_modules.insert_one(pm.dict())
-        return {
-            "message": "Publication module created successfully",
-            "pm_code": pm.pm_code,
-        }
-    except Exception as e:
-        logger.error(f"Error creating publication module: {str(e)}")
-        raise HTTPException(500, f"Error creating publication module: {str(e)}")
+    pm = PublicationModule(**pm_data)
+    await db.publication_modules.insert_one(pm.model_dump())
+    return {
+        "message": "Publication module created successfully",
+        "pm_code": pm.pm_code,
+    }
 
 
 @api_router.get("/publication-modules/{pm_code}")
 async def get_publication_module(pm_code: str):
     """Get a specific publication module."""
-    try:
-        pm = await db.publication_modules.find_one({"pm_code": pm_code})
-        if not pm:
-            raise HTTPException(404, "Publication module not found")
-        return PublicationModule(**pm)
-    except Exception as e:
-        logger.error(f"Error fetching publication module: {str(e)}")
-        raise HTTPException(500, f"Error fetching publication module: {str(e)}")
+    pm = await db.publication_modules.find_one({"pm_code": pm_code})
+    if not pm:
+        raise HTTPException(404, "Publication module not found")
+    return PublicationModule(**pm)
 
 
 @api_router.post("/publication-modules/{pm_code}/publish")
@@ -886,79 +1039,69 @@ async def publish_publication_module(
     _: User = Depends(require_admin),
 ):
     """Publish a publication module."""
-    try:
-        pm = await db.publication_modules.find_one({"pm_code": pm_code})
-        if not pm:
-            raise HTTPException(404, "Publication module not found")
-
-        pm_obj = PublicationModule(**pm)
-        formats = publish_options.get("formats", ["xml"])
-        variants = publish_options.get("variants", ["verbatim"])
-        publish_result = await document_service.publish_publication_module(
-            pm_obj, db, formats=formats, variants=variants
-        )
-        package_path = publish_result["package"]
-        errors = publish_result.get("errors", [])
-        return {
-            "message": "Publication module published successfully",
-            "pm_code": pm_code,
-            "package": str(package_path),
-            "errors": errors,
-            "formats": formats,
-            "variants": variants,
-        }
-    except Exception as e:
-        logger.error(f"Error publishing publication module: {str(e)}")
-        raise HTTPException(500, f"Error publishing publication module: {str(e)}")
+    pm = await db.publication_modules.find_one({"pm_code": pm_code})
+    if not pm:
+        raise HTTPException(404, "Publication module not found")
+
+    pm_obj = PublicationModule(**pm)
+    formats = publish_options.get("formats", ["xml"])
+    variants = publish_options.get("variants", ["verbatim"])
+    publish_result = await document_service.publish_publication_module(
+        pm_obj, db, formats=formats, variants=variants
+    )
+    package_path = publish_result["package"]
+    errors = publish_result.get("errors", [])
+    return {
+        "message": "Publication module published successfully",
+        "pm_code": pm_code,
+        "package": str(package_path),
+        "errors": errors,
+        "formats": formats,
+        "variants": variants,
+    }
 
 
 # Test endpoints for AI providers
 @api_router.post("/test/text")
 async def test_text_provider(text: str, task_type: str = "classify"):
     """Test text provider."""
-    try:
-        from .ai_providers.base import TextProcessingRequest
+    from .ai_providers.base import TextProcessingRequest
 
-        text_provider = ProviderFactory.create_text_provider()
-        request = TextProcessingRequest(text=text, task_type=task_type)
+    text_provider = ProviderFactory.create_text_provider()
+    request = TextProcessingRequest(text=text, task_type=task_type)
 
-        if task_type == "classify":
-            response = await text_provider.classify_document(request)
-        elif task_type == "extract":
-            response = await text_provider.extract_structured_data(request)
-        elif task_type == "rewrite":
-            response = await text_provider.rewrite_to_ste(request)
-        else:
-            raise HTTPException(400, "Invalid task type")
+    if task_type == "classify":
+        response = await text_provider.classify_document(request)
+    elif task_type == "extract":
+        response = await text_provider.extract_structured_data(request)
+    elif task_type == "rewrite":
+        response = await text_provider.rewrite_to_ste(request)
+    else:
+        raise HTTPException(400, "Invalid task type")
 
-        return response.dict()
-    except Exception as e:
-        logger.error(f"Error testing text provider: {str(e)}")
-        raise HTTPException(500, f"Error testing text provider: {str(e)}")
+    return msgspec.structs.asdict(response)
 
 
 @api_router.post("/test/vision")
 async def test_vision_provider(image_data: str, task_type: str = "caption"):
     """Test vision provider."""
-    try:
-        from .ai_providers.base import VisionProcessingRequest
-
-        vision_provider = ProviderFactory.create_vision_provider()
-        request = VisionProcessingRequest(image_data=image_data, task_type=task_type)
-
-        if task_type == "caption":
-            response = await vision_provider.generate_caption(request)
-        elif task_type == "objects":
-            response = await vision_provider.detect_objects(request)
-        elif task_type == "hotspots":
-            response = await vision_provider.generate_hotspots(request)
-        else:
-            raise HTTPException(400, "Invalid task type")
+    from .ai_providers.base import VisionProcessingRequest
+
+    vision_provider = ProviderFactory.create_vision_provider()
+    # Large payloads would stall every other request if decoded on the loop.
+    image_bytes = await asyncio.to_thread(base64.b64decode, image_data)
+    request = VisionProcessingRequest(image_data=image_bytes, task_type=task_type)
+
+    if task_type == "caption":
+        response = await vision_provider.generate_caption(request)
+    elif task_type == "objects":
+        response = await vision_provider.detect_objects(request)
+    elif task_type == "hotspots":
+        response = await vision_provider.generate_hotspots(request)
+    else:
+        raise HTTPException(400, "Invalid task type")
 
-        return response.dict()
-    except Exception as e:
-        logger.error(f"Error testing vision provider: {str(e)}")
-        raise HTTPException(500, f"Error testing vision provider: {str(e)}")
+    return msgspec.structs.asdict(response)
 
 
 # Include the router in the main app
@@ -970,7 +1113,8 @@ app.include_router(api_router)
 @app.on_event("shutdown")
 async def shutdown_db_client():
     """Close database connection on shutdown."""
-    client.close()
+    if client is not None:
+        client.close()
 
 
 if __name__ == "__main__":
@@ -1,9 +1,13 @@
 import aiofiles
-import json
-from datetime import datetime
+import orjson
 from pathlib import Path
 from typing import Any, Dict
 
+from ..models.base import utcnow
+
+
+_DUMPS_OPTIONS = orjson.OPT_APPEND_NEWLINE | orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY
+
 
 class AuditService:
     """Simple asynchronous audit logger."""
@@ -15,6 +19,9 @@ class AuditService:
     async def log(self, entry: Dict[str, Any]) -> None:
         """Append an audit entry as JSON."""
         entry = entry.copy()
-        entry["timestamp"] = datetime.utcnow().isoformat()
-        async with aiofiles.open(self.audit_file, "a") as f:
-            await f.write(json.dumps(entry) + "\n")
+        entry["timestamp"] = utcnow().isoformat()
+        # orjson writes datetimes, enums and numpy values natively, which the
+        # entries built from data modules and processing logs often contain.
+        line = orjson.dumps(entry, option=_DUMPS_OPTIONS)
+        async with aiofiles.open(self.audit_file, "ab") as f:
+            await f.write(line)
@@ -1,9 +1,8 @@
 """Document processing service."""
 
 import hashlib
-import base64
 import aiofiles
-from typing import List, Dict, Any, Callable
+from typing import List, Dict, Any, Callable, Tuple
 from pathlib import Path
 import shutil
 import os
@@ -23,7 +22,6 @@ import asyncio
 import uuid
 import re
 import logging
-from datetime import datetime
 
 from ..models.document import (
     UploadedDocument,
@@ -32,13 +30,16 @@ from ..models.document import (
     ProcessingTask,
     PublicationModule,
 )
-from ..models.base import DMTypeEnum, SettingsModel, StructureType, SecurityLevel
+from ..models.base import DMTypeEnum, SettingsModel, StructureType, SecurityLevel, utcnow
 from ..ai_providers.provider_factory import ProviderFactory
 from ..ai_providers.base import TextProcessingRequest, VisionProcessingRequest
 from ..services.audit import AuditService
 
 logger = logging.getLogger(__name__)
 
+# Uploads are copied to disk this many bytes at a time
+UPLOAD_CHUNK_SIZE = 1 << 20
+
 # Default structural codes based on S1000D operational environment
 DEFAULT_STRUCTURE_CODES: Dict[StructureType, Dict[str, str]] = {
     StructureType.AIR: {
@@ -135,6 +136,41 @@ class DocumentService:
             metadata={},
         )
 
+    async def upload_document_stream(
+        self,
+        stream,
+        filename: str,
+        mime_type: str,
+        security_level: SecurityLevel = SecurityLevel.UNCLASSIFIED,
+    ) -> UploadedDocument:
+        """Upload and store a document read in chunks from ``stream``.
+
+        ``stream`` is any object with an awaitable ``read(size)``, such as a
+        FastAPI ``UploadFile``; the file is hashed and written as it arrives
+        instead of being held in memory.
+        """
+        sha256 = hashlib.sha256()
+        file_size = 0
+        file_path = self.upload_path / f"{uuid.uuid4()}{Path(filename).suffix}"
+        try:
+            async with aiofiles.open(file_path, "wb") as f:
+                while chunk := await stream.read(UPLOAD_CHUNK_SIZE):
+                    sha256.update(chunk)
+                    file_size += len(chunk)
+                    await f.write(chunk)
+        except BaseException:
+            file_path.unlink(missing_ok=True)
+            raise
+        return UploadedDocument(
+            filename=filename,
+            file_path=str(file_path),
+            mime_type=mime_type,
+            file_size=file_size,
+            sha256_hash=sha256.hexdigest(),
+            security_level=security_level,
+            metadata={},
+        )
+
     async def extract_text_from_document(self, document: UploadedDocument) -> str:
         """Extract text content from a document."""
         fp = Path(document.file_path)
@@ -163,10 +199,15 @@ class DocumentService:
             logger.error(f"Error extracting text from {document.filename}: {e}")
             return ""
 
+    @staticmethod
+    def _read_pdf_text(file_path: Path) -> str:
+        reader = PdfReader(str(file_path))
+        return "".join(page.extract_text() + "\n" for page in reader.pages)
+
     async def _extract_pdf_text(self, file_path: Path) -> str:
         try:
-            reader = PdfReader(str(file_path))
-            return "".join(page.extract_text() + "\n" for page in reader.pages)
+            # Off the event loop, so it can overlap with page rasterisation.
+            return await asyncio.to_thread(self._read_pdf_text, file_path)
         except Exception as e:
             logger.error(f"Error extracting PDF text: {e}")
             return ""
@@ -248,14 +289,10 @@ class DocumentService:
             return []
 
         for idx, img in enumerate(pages, start=1):
-            filename = f"{file_path.stem}_page{idx}.png"
+            filename = self._page_filename(file_path, idx)
             out_path = self.icn_path / filename
-            img.save(out_path, format="PNG")
-            async with aiofiles.open(out_path, "rb") as f:
-                data = await f.read()
-            sha256_hash = hashlib.sha256(data).hexdigest()
+            sha256_hash, context = await asyncio.to_thread(self._save_page, img, out_path)
             width, height = img.size
-            context = pytesseract.image_to_string(img)
             icns.append(
                 ICN(
                     filename=filename,
@@ -270,6 +307,41 @@ class DocumentService:
             )
         return icns
 
+    @staticmethod
+    def _page_filename(file_path: Path, idx: int) -> str:
+        return f"{file_path.stem}_page{idx}.png"
+
+    async def adopt_icns(self, document: UploadedDocument, icns: List[ICN]) -> List[ICN]:
+        """Give ICNs reused from an identical upload ``document``'s own files and LCNs.
+
+        Page images are copied to the names :meth:`_extract_pdf_images` would
+        have written, so the ICNs stay valid if the original upload is removed.
+        """
+        if document.mime_type.startswith("image/"):
+            for icn in icns:
+                icn.filename = document.filename
+                icn.file_path = document.file_path
+                icn.lcn = self._derive_lcn(document.filename)
+            return icns
+        file_path = Path(document.file_path)
+        for idx, icn in enumerate(icns, start=1):
+            filename = self._page_filename(file_path, idx)
+            out_path = self.icn_path / filename
+            await asyncio.to_thread(shutil.copyfile, icn.file_path, out_path)
+            icn.filename = filename
+            icn.file_path = str(out_path)
+            icn.lcn = self._derive_lcn(filename)
+        return icns
+
+    @staticmethod
+    def _save_page(img, out_path: Path) -> Tuple[str, str]:
+        """Write a rendered page as PNG; return its SHA-256 and OCR text."""
+        buffer = io.BytesIO()
+        img.save(buffer, format="PNG")
+        data = buffer.getvalue()
+        out_path.write_bytes(data)
+        return hashlib.sha256(data).hexdigest(), pytesseract.image_to_string(img)
+
     async def _process_single_image(self, document: UploadedDocument) -> List[ICN]:
         try:
             async with aiofiles.open(document.file_path, "rb") as f:
@@ -349,6 +421,7 @@ class DocumentService:
         icns = await self.db.icns.find().to_list(1000)
         lcn_set = {i.get("lcn") for i in icns}
         dmc_set = {m.get("dmc") for m in modules}
+        now = utcnow()
         for m in modules:
             dm_refs = set(m.get("dm_refs", []))
             icn_refs = set(m.get("icn_refs", []))
@@ -362,7 +435,7 @@ class DocumentService:
             if dm_refs != set(m.get("dm_refs", [])) or icn_refs != set(m.get("icn_refs", [])):
                 await self.db.data_modules.update_one(
                     {"dmc": m.get("dmc")},
-                    {"$set": {"dm_refs": list(dm_refs), "icn_refs": list(icn_refs), "updated_at": datetime.utcnow()}}
+                    {"$set": {"dm_refs": list(dm_refs), "icn_refs": list(icn_refs), "updated_at": now}}
                 )
 
     async def process_document_with_ai(
@@ -375,15 +448,20 @@ class DocumentService:
             if extra_text:
                 text_content = f"{text_content}\n{extra_text}"[:10000]
         try:
-            classification = TextProcessingRequest(
-                text=text_content, task_type="classify"
+            # The three calls only depend on the text, so they run concurrently.
+            class_response, extract_res, rewrite_res = await asyncio.gather(
+                text_provider.classify_document(
+                    TextProcessingRequest(text=text_content, task_type="classify")
+                ),
+                text_provider.extract_structured_data(
+                    TextProcessingRequest(text=text_content, task_type="extract")
+                ),
+                text_provider.rewrite_to_ste(
+                    TextProcessingRequest(text=text_content, task_type="rewrite")
+                ),
             )
-            class_response = await text_provider.classify_document(classification)
             if "error" in class_response.result:
                 raise Exception(class_response.result["error"])
-
-            extract_req = TextProcessingRequest(text=text_content, task_type="extract")
-            extract_res = await text_provider.extract_structured_data(extract_req)
             if "error" in extract_res.result:
                 raise Exception(extract_res.result["error"])
 
@@ -415,9 +493,6 @@ class DocumentService:
                 icn_refs=icn_refs,
             )
 
-            rewrite_req = TextProcessingRequest(text=text_content, task_type="rewrite")
-            rewrite_res = await text_provider.rewrite_to_ste(rewrite_req)
-
             modules = [verbatim]
             if "error" not in rewrite_res.result:
                 ste_dm = DataModule(
@@ -487,31 +562,42 @@ class DocumentService:
         )
 
     async def process_image_with_ai(self, icn: ICN) -> ICN:
+        icn, _ = await self.describe_image(icn)
+        return icn
+
+    async def describe_image(self, icn: ICN) -> Tuple[ICN, bool]:
+        """Caption ``icn`` and detect its objects and hotspots.
+
+        Also returns whether every vision call succeeded. Providers report
+        failures in the response's ``error`` rather than raising; a low
+        confidence, such as no detections, is still a valid result.
+        """
         vision_provider = ProviderFactory.create_vision_provider()
         try:
             async with aiofiles.open(icn.file_path, "rb") as f:
                 image_data = await f.read()
-            image_base64 = base64.b64encode(image_data).decode("utf-8")
-            caption_req = VisionProcessingRequest(
-                image_data=image_base64, task_type="caption"
+            caption_res, objects_res, hotspots_res = await asyncio.gather(
+                vision_provider.generate_caption(
+                    VisionProcessingRequest(image_data=image_data, task_type="caption")
+                ),
+                vision_provider.detect_objects(
+                    VisionProcessingRequest(image_data=image_data, task_type="objects")
+                ),
+                vision_provider.generate_hotspots(
+                    VisionProcessingRequest(image_data=image_data, task_type="hotspots")
+                ),
             )
-            caption_res = await vision_provider.generate_caption(caption_req)
-            objects_req = VisionProcessingRequest(
-                image_data=image_base64, task_type="objects"
-            )
-            objects_res = await vision_provider.detect_objects(objects_req)
-            hotspots_req = VisionProcessingRequest(
-                image_data=image_base64, task_type="hotspots"
-            )
-            hotspots_res = await vision_provider.generate_hotspots(hotspots_req)
             icn.caption = caption_res.caption
             icn.objects = objects_res.objects
             icn.hotspots = hotspots_res.hotspots
-            return icn
+            succeeded = not any(
+                res.error for res in (caption_res, objects_res, hotspots_res)
+            )
+            return icn, succeeded
         except Exception as e:
             logger.error(f"Error processing image with AI: {e}")
             icn.caption = f"Error processing image: {e}"
-            return icn
+            return icn, False
 
     def _render_pdf(self, module: DataModule, icns: List[ICN], pdf_path: Path) -> None:
         """Render a PDF file for the given data module."""
@@ -1,7 +1,9 @@
+import asyncio
 import os
 import types
+import pytest
 from fastapi.testclient import TestClient
-from backend.models.document import DataModule, PublicationModule
+from backend.models.document import DataModule, ICN, PublicationModule, UploadedDocument
 from backend.models.base import DMTypeEnum
 from backend.services.document_service import DocumentService
 
@@ -51,6 +53,9 @@ class FakeCollection:
     async def insert_one(self, data):
         self.docs.append(data)
 
+    def with_options(self, **kwargs):
+        return self
+
     async def update_one(self, query, update):
         key = list(query.keys())[0]
         val = query[key]
@@ -121,3 +126,87 @@ def test_validation_and_publish(tmp_path):
     resp = r.json()
     assert os.path.exists(resp["package"])
     assert resp.get("errors") == []
+
+
+class FakeProcessingCollection(FakeCollection):
+    def find(self, query, projection=None):
+        return FakeCursor(self.docs)
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+
+@pytest.mark.parametrize(
+    "image_ok, module_status, cached",
+    [(True, "completed", True), (False, "completed", False), (True, "error", False)],
+)
+def test_process_document_caches_only_complete_ai_results(tmp_path, image_ok, module_status, cached):
+    server.document_service = service = DocumentService(upload_path=tmp_path)
+    doc = UploadedDocument(
+        filename="pump.png",
+        file_path=str(tmp_path / "pump.png"),
+        mime_type="image/png",
+        file_size=3,
+        sha256_hash="abc",
+    )
+    icn = ICN(filename=doc.filename, file_path=doc.file_path, sha256_hash="abc", mime_type="image/png")
+
+    async def no_text(document):
+        return ""
+
+    async def one_image(document):
+        return [icn]
+
+    async def describe(image):
+        image.caption = "A pump" if image_ok else "Error generating caption: timeout"
+        return image, image_ok
+
+    async def modules(document, text):
+        return [
+            DataModule(
+                dmc="DMC-TEST",
+                title="pump.png",
+                dm_type=DMTypeEnum.GEN,
+                info_variant="00",
+                source_document_id=document.id,
+                processing_status=module_status,
+            )
+        ]
+
+    async def nothing(*args, **kwargs):
+        return None
+
+    service.extract_text_from_document = no_text
+    service.extract_images_from_document = one_image
+    service.describe_image = describe
+    service.process_document_with_ai = modules
+    service.refresh_cross_references = nothing
+    service.audit_service.log = nothing
+    service.load_settings = nothing
+
+    db = types.SimpleNamespace(
+        documents=FakeProcessingCollection([doc.model_dump()]),
+        ai_cache=FakeProcessingCollection([]),
+        icns=FakeProcessingCollection([]),
+        data_modules=FakeProcessingCollection([]),
+    )
+    server.db = db
+    user = types.SimpleNamespace(username="u")
+    result = asyncio.run(server.process_document(doc.id, current_user=user))
+
+    assert result["images"] == 1
+    assert len(db.icns.docs) == 1
+    assert len(db.ai_cache.docs) == int(cached)
+
+
+def test_unhandled_error_keeps_cors_headers():
+    class BrokenCollection:
+        async def find_one(self, query):
+            raise RuntimeError("database unavailable")
+
+    server.db = types.SimpleNamespace(documents=BrokenCollection())
+    client = TestClient(server.app)
+    r = client.get("/api/documents/doc1", headers={"Origin": "http://localhost:3000"})
+    assert r.status_code == 500
+    assert r.json() == {"detail": "database unavailable"}
+    assert "access-control-allow-origin" in r.headers
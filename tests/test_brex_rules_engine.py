@@ -1,6 +1,6 @@
 import pytest
 
-from backend.brex_rules import apply_brex_rules
+from backend.brex_rules import BrexRuleSet, apply_brex_rules
 from backend.models.base import DMTypeEnum, SettingsModel
 from backend.models.document import DataModule
 from backend.services.document_service import DocumentService
@@ -42,3 +42,44 @@ def test_apply_brex_rules_flags_empty_title(tmp_path):
     xml = create_xml(tmp_path, "DMC-TEST", "")
     violations = apply_brex_rules(xml, RULES)
     assert any(v.startswith("BREX-TITLE-001") for v in violations)
+
+
+def test_apply_brex_rules_skips_rules_for_absent_elements():
+    xml = "<dmodule><dmc>DMC-TEST</dmc></dmodule>"
+    rules = [
+        {"id": "BREX-PARA-001", "xpath": "//para", "message": "No paragraphs allowed"},
+        {"id": "BREX-PARA-002", "xpath": "//dmodule[not(para)]", "message": "Paragraph required"},
+    ]
+    assert apply_brex_rules(xml, rules) == ["BREX-PARA-002: Paragraph required"]
+
+
+def test_apply_brex_rules_accepts_compiled_rule_set(tmp_path):
+    xml = create_xml(tmp_path, "BAD-1", "")
+    assert apply_brex_rules(xml, BrexRuleSet(RULES)) == apply_brex_rules(xml, RULES)
+
+
+@pytest.mark.parametrize("xpath", ["//dmodule/@lang", "//dmodule/attribute::lang"])
+def test_apply_brex_rules_does_not_require_attribute_steps_as_elements(xpath):
+    rules = [{"id": "BREX-LANG-001", "xpath": xpath, "message": "Language attribute not allowed"}]
+    assert apply_brex_rules('<dmodule lang="x"/>', rules) == [
+        "BREX-LANG-001: Language attribute not allowed"
+    ]
+
+
+def test_brex_rule_set_skips_malformed_xpath():
+    rules = [{"id": "BREX-BAD-001", "xpath": "//dmodule[", "message": "Broken"}, *RULES]
+    rule_set = BrexRuleSet(rules)
+    assert len(rule_set.rules) == len(RULES)
+    xml = "<dmodule><dmc>BAD-1</dmc></dmodule>"
+    assert apply_brex_rules(xml, rule_set) == ["BREX-DMC-001: DMC must start with 'DMC-'"]
+
+
+def test_apply_brex_rules_parallel_keeps_rule_order(monkeypatch):
+    import backend.brex_rules as brex_rules
+
+    xml = "<dmodule><dmc>BAD-1</dmc><title/></dmodule>"
+    rules = [dict(rule, id=f"{rule['id']}-{i}") for i in range(brex_rules.PARALLEL_RULE_THRESHOLD) for rule in RULES]
+    sequential = apply_brex_rules(xml, rules)
+    monkeypatch.setattr(brex_rules, "_WORKERS", 2)
+    assert apply_brex_rules(xml, rules) == sequential
+    assert len(sequential) == len(rules)
@@ -6,19 +6,19 @@ os.environ.setdefault("SECRET_KEY", "test")
 from fastapi.testclient import TestClient
 from backend import server
 
-client = TestClient(server.app)
 
 def test_get_brex_xml_rules():
-    # register and obtain token
-    client.post("/auth/register", data={"username": "u", "password": "p"})
-    token = client.post(
-        "/auth/token", data={"username": "u", "password": "p"}
-    ).json()["access_token"]
-    response = client.get(
-        "/api/brex-xml-rules", headers={"Authorization": f"Bearer {token}"}
-    )
+    # The database connection is opened by the app's startup handlers.
+    with TestClient(server.app) as client:
+        # register and obtain token
+        client.post("/auth/register", data={"username": "u", "password": "p"})
+        token = client.post(
+            "/auth/token", data={"username": "u", "password": "p"}
+        ).json()["access_token"]
+        response = client.get(
+            "/api/brex-xml-rules", headers={"Authorization": f"Bearer {token}"}
+        )
     assert response.status_code == 200
     data = response.json()
     assert isinstance(data, list)
     assert any(r["id"] == "BREX-S1-00001" for r in data)
-
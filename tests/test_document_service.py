@@ -1,4 +1,5 @@
 import hashlib
+import io
 import asyncio
 from pathlib import Path
 import tempfile
@@ -8,7 +9,7 @@ from docx import Document as DocxDocument
 from reportlab.pdfgen import canvas
 
 from backend.services.document_service import DocumentService
-from backend.models.document import UploadedDocument, DataModule, PublicationModule
+from backend.models.document import UploadedDocument, DataModule, PublicationModule, ICN
 from backend.models.base import DMTypeEnum, SecurityLevel
 import zipfile
 import os
@@ -164,3 +165,81 @@ def test_process_document_carries_security_and_warnings(tmp_path):
         assert m.security_level == SecurityLevel.SECRET
         assert "<warning>" in m.content
         assert "<caution>" in m.content
+
+
+def test_upload_document_stream_hashes_and_stores_chunks(tmp_path):
+    data = os.urandom(3 * 1024 * 1024 + 17)
+
+    class Stream:
+        def __init__(self):
+            self.buffer = io.BytesIO(data)
+
+        async def read(self, size):
+            return self.buffer.read(size)
+
+    service = DocumentService(upload_path=tmp_path)
+    doc = asyncio.run(service.upload_document_stream(Stream(), "big.pdf", "application/pdf"))
+    assert doc.file_size == len(data)
+    assert doc.sha256_hash == hashlib.sha256(data).hexdigest()
+    assert Path(doc.file_path).read_bytes() == data
+
+
+class DummyVisionProvider:
+    def __init__(self, caption_error=""):
+        self.caption_error = caption_error
+
+    async def generate_caption(self, request):
+        return types.SimpleNamespace(caption="A pump", confidence=0.85, error=self.caption_error)
+
+    async def detect_objects(self, request):
+        # Nothing detected: zero confidence, but not a failure
+        return types.SimpleNamespace(objects=[], confidence=0.0, error="")
+
+    async def generate_hotspots(self, request):
+        return types.SimpleNamespace(hotspots=[], confidence=0.0, error="")
+
+
+@pytest.mark.parametrize("caption_error, succeeded", [("", True), ("timeout", False)])
+def test_describe_image_reports_failed_vision_calls(tmp_path, monkeypatch, caption_error, succeeded):
+    image_path = tmp_path / "pump.png"
+    image_path.write_bytes(b"png")
+    icn = ICN(filename="pump.png", file_path=str(image_path), sha256_hash="x", mime_type="image/png")
+    monkeypatch.setattr(
+        ProviderFactory, "create_vision_provider", lambda: DummyVisionProvider(caption_error)
+    )
+
+    service = DocumentService(upload_path=tmp_path)
+    icn, ok = asyncio.run(service.describe_image(icn))
+    assert ok is succeeded
+    assert icn.caption == "A pump"
+
+
+def test_describe_image_reports_unreadable_image(tmp_path, monkeypatch):
+    icn = ICN(filename="gone.png", file_path=str(tmp_path / "gone.png"), sha256_hash="x", mime_type="image/png")
+    monkeypatch.setattr(ProviderFactory, "create_vision_provider", lambda: DummyVisionProvider())
+
+    service = DocumentService(upload_path=tmp_path)
+    icn, ok = asyncio.run(service.describe_image(icn))
+    assert ok is False
+    assert icn.caption.startswith("Error processing image")
+
+
+def test_adopt_icns_copies_pages_for_new_upload(tmp_path):
+    service = DocumentService(upload_path=tmp_path)
+    old_page = service.icn_path / "old_page1.png"
+    old_page.write_bytes(b"page")
+    cached = ICN(
+        filename=old_page.name, file_path=str(old_page), sha256_hash="x", mime_type="image/png", caption="Cached"
+    )
+    doc = UploadedDocument(
+        filename="again.pdf",
+        file_path=str(tmp_path / "new.pdf"),
+        mime_type="application/pdf",
+        file_size=4,
+        sha256_hash="x",
+    )
+
+    (icn,) = asyncio.run(service.adopt_icns(doc, [cached]))
+    assert icn.filename == "new_page1.png"
+    assert Path(icn.file_path).read_bytes() == b"page"
+    assert icn.caption == "Cached"
@@ -26,6 +26,14 @@ class FakeCollection:
             return types.SimpleNamespace(matched_count=1)
         return types.SimpleNamespace(matched_count=0)
 
+    async def find_one_and_update(self, query, update, projection=None, return_document=False):
+        doc = await self.find_one(query)
+        if doc is None:
+            return None
+        before = dict(doc)
+        doc.update(update.get("$set", {}))
+        return dict(doc) if return_document else before
+
     async def update_many(self, query, update):
         count = 0
         val = query.get("icn_refs")
@@ -0,0 +1,121 @@
+import asyncio
+import base64
+
+import numpy as np
+
+from backend.ai_providers import base
+from backend.ai_providers.base import (
+    TextProcessingRequest,
+    TextProcessingResponse,
+    VisionProcessingRequest,
+    VisionProcessingResponse,
+    semantic_cached,
+)
+
+
+class CountingProvider:
+    model = "m"
+
+    def __init__(self):
+        self.calls = 0
+
+    @semantic_cached(task="classify")
+    async def classify_document(self, request):
+        self.calls += 1
+        return TextProcessingResponse(result={"dm_type": "PROC"}, confidence=0.9)
+
+    @semantic_cached(task="caption")
+    async def generate_caption(self, request):
+        self.calls += 1
+        return VisionProcessingResponse(caption="pump", confidence=0.8)
+
+
+def fake_embed(text):
+    vec = np.array([text.count("pump"), text.count("valve"), 1.0], dtype=np.float32)
+    return vec / np.linalg.norm(vec)
+
+
+def test_semantic_cache_hits_similar_text(monkeypatch):
+    monkeypatch.setattr(base, "embed_text", fake_embed)
+    monkeypatch.setattr(base, "_SEMANTIC_CACHES", {})
+    provider = CountingProvider()
+
+    first = asyncio.run(provider.classify_document(TextProcessingRequest(text="pump", task_type="classify")))
+    again = asyncio.run(provider.classify_document(TextProcessingRequest(text="the pump", task_type="classify")))
+    asyncio.run(provider.classify_document(TextProcessingRequest(text="valve", task_type="classify")))
+
+    assert provider.calls == 2
+    assert again.result == first.result
+
+
+def test_semantic_cache_matches_images_exactly(monkeypatch):
+    monkeypatch.setattr(base, "_SEMANTIC_CACHES", {})
+    provider = CountingProvider()
+    image = base64.b64encode(b"image-bytes").decode()
+
+    asyncio.run(provider.generate_caption(VisionProcessingRequest(image_data=image, task_type="caption")))
+    asyncio.run(provider.generate_caption(VisionProcessingRequest(image_data=image, task_type="caption")))
+    other = base64.b64encode(b"other-bytes").decode()
+    asyncio.run(provider.generate_caption(VisionProcessingRequest(image_data=other, task_type="caption")))
+
+    assert provider.calls == 2
+
+
+def test_exact_cache_skips_repeat_text(monkeypatch):
+    monkeypatch.setattr(base, "_EXACT_CACHE", {})
+    monkeypatch.setattr(base, "_EXACT_CACHE_STATS", {"hits": 0, "misses": 0})
+
+    class RewriteProvider:
+        model = "m"
+        calls = 0
+
+        @base.exact_cached(task="rewrite")
+        async def rewrite_to_ste(self, request):
+            self.calls += 1
+            return TextProcessingResponse(result={"rewritten_text": request.text.upper()})
+
+    provider = RewriteProvider()
+    for text in ("close the valve", "close the valve", "open the valve"):
+        asyncio.run(provider.rewrite_to_ste(TextProcessingRequest(text=text, task_type="rewrite")))
+
+    assert provider.calls == 2
+    assert base.exact_cache_stats() == {"hits": 1, "misses": 2, "size": 2}
+
+
+def test_exact_cache_coalesces_concurrent_duplicates(monkeypatch):
+    monkeypatch.setattr(base, "_EXACT_CACHE", {})
+
+    class RewriteProvider:
+        model = "m"
+        calls = 0
+
+        @base.exact_cached(task="rewrite")
+        async def rewrite_to_ste(self, request):
+            self.calls += 1
+            await asyncio.sleep(0.01)
+            return TextProcessingResponse(result={"rewritten_text": request.text.upper()})
+
+    provider = RewriteProvider()
+
+    async def run():
+        request = TextProcessingRequest(text="close the valve", task_type="rewrite")
+        return await asyncio.gather(*(provider.rewrite_to_ste(request) for _ in range(3)))
+
+    responses = asyncio.run(run())
+
+    assert provider.calls == 1
+    assert all(r.result == {"rewritten_text": "CLOSE THE VALVE"} for r in responses)
+
+
+def test_semantic_cache_is_keyed_on_task_model(monkeypatch):
+    monkeypatch.setattr(base, "embed_text", fake_embed)
+    monkeypatch.setattr(base, "_SEMANTIC_CACHES", {})
+    provider = CountingProvider()
+    provider.models = {"classify": "small"}
+    request = TextProcessingRequest(text="pump", task_type="classify")
+
+    asyncio.run(provider.classify_document(request))
+    provider.models = {"classify": "large"}
+    asyncio.run(provider.classify_document(request))
+
+    assert provider.calls == 2